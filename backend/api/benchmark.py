@@ -0,0 +1,373 @@
+import base64
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.counters import COUNTERS
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    ShoppingCartIngredient,
+)
+from recipes.recommendations import recompute
+from recipes.search import get_recipe_search
+from users.models import Subscription, User
+
+
+@dataclass
+class DatasetSize:
+    users: int = 50
+    recipes: int = 500
+    ingredients: int = 300
+    ingredients_per_recipe: int = 8
+    favorites_per_user: int = 20
+    cart_per_user: int = 10
+    subscriptions_per_user: int = 10
+    seed: int = 1
+
+
+def seed_dataset(size):
+    """
+    Заполняет базу синтетическими данными пакетными вставками.
+    Возвращает список созданных пользователей.
+    """
+    rnd = random.Random(size.seed)
+    password = make_password("benchmark-password")
+    User.objects.bulk_create(
+        User(
+            email=f"bench{idx}@example.com",
+            username=f"bench{idx}",
+            first_name="Имя",
+            last_name=f"Фамилия{idx}",
+            password=password,
+        )
+        for idx in range(size.users)
+    )
+    users = list(User.objects.filter(username__startswith="bench"))
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f"ингредиент {idx:05d}", measurement_unit="г")
+        for idx in range(size.ingredients)
+    )
+    ingredient_ids = list(Ingredient.objects.values_list("id", flat=True))
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=rnd.choice(users),
+            name=f"Рецепт {idx}",
+            image="recipes/images/benchmark.png",
+            text="Описание рецепта. " * 20,
+            cooking_time=rnd.randint(1, 120),
+        )
+        for idx in range(size.recipes)
+    )
+    recipe_ids = list(Recipe.objects.values_list("id", flat=True))
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(
+            recipe_id=recipe_id, ingredient_id=ingredient_id, amount=amount
+        )
+        for recipe_id in recipe_ids
+        for ingredient_id, amount in zip(
+            rnd.sample(
+                ingredient_ids,
+                min(size.ingredients_per_recipe, len(ingredient_ids)),
+            ),
+            iter(lambda: rnd.randint(1, 500), None),
+        )
+    )
+    for model, per_user in (
+        (Favorite, size.favorites_per_user),
+        (ShoppingCart, size.cart_per_user),
+    ):
+        model.objects.bulk_create(
+            model(user=user, recipe_id=recipe_id)
+            for user in users
+            for recipe_id in rnd.sample(
+                recipe_ids, min(per_user, len(recipe_ids))
+            )
+        )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, author=author)
+        for user in users
+        for author in rnd.sample(
+            users, min(size.subscriptions_per_user + 1, len(users))
+        )
+        if author != user
+    )
+    ShoppingCartIngredient.objects.rebuild()
+    for counter in COUNTERS:
+        counter.reconcile()
+    get_recipe_search().index()
+    recompute(settings.RECIPE_NEIGHBORS_TOP_K, full=True)
+    return users
+
+
+def tiny_png():
+    buffer = BytesIO()
+    Image.new("RGB", (8, 8), "white").save(buffer, "PNG")
+    return (
+        "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    data: dict = None
+    anonymous: bool = False
+    teardown: tuple = None
+
+
+def build_scenarios(user, other):
+    """Запросы ко всем маршрутам api/urls.py, кроме почтовых djoser."""
+    recipe = (
+        Recipe.objects.exclude(author=user)
+        .exclude(favorites__user=user)
+        .exclude(shopping_carts__user=user)
+        .first()
+    )
+    bulk_ids = list(
+        Recipe.objects.exclude(author=user)
+        .exclude(favorites__user=user)
+        .exclude(shopping_carts__user=user)
+        .exclude(pk=recipe.pk)
+        .values_list("id", flat=True)[:10]
+    )
+    own_recipe = Recipe.objects.filter(author=user).first()
+    ingredient = Ingredient.objects.first()
+    ingredient_ids = list(Ingredient.objects.values_list("id", flat=True)[:20])
+    recipe_payload = {
+        "ingredients": [{"id": pk, "amount": 10} for pk in ingredient_ids[:5]],
+        "image": tiny_png(),
+        "name": "Рецепт из бенчмарка",
+        "text": "Описание",
+        "cooking_time": 10,
+    }
+    return [
+        Scenario("users-list", "get", "/api/users/?limit=10"),
+        Scenario("users-detail", "get", f"/api/users/{other.id}/"),
+        Scenario("users-me", "get", "/api/users/me/"),
+        Scenario(
+            "users-avatar",
+            "put",
+            "/api/users/me/avatar/",
+            {"avatar": tiny_png()},
+        ),
+        Scenario(
+            "users-subscribe",
+            "post",
+            f"/api/users/{other.id}/subscribe/?recipes_limit=3",
+            teardown=("delete", f"/api/users/{other.id}/subscribe/"),
+        ),
+        Scenario(
+            "subscriptions",
+            "get",
+            "/api/users/subscriptions/?limit=6&recipes_limit=3",
+        ),
+        Scenario(
+            "subscriptions-cursor",
+            "get",
+            "/api/users/subscriptions/?cursor=&limit=6&recipes_limit=3",
+        ),
+        Scenario(
+            "users-set-password",
+            "post",
+            "/api/users/set_password/",
+            {
+                "current_password": "benchmark-password",
+                "new_password": "benchmark-password",
+            },
+        ),
+        Scenario(
+            "token-login",
+            "post",
+            "/api/auth/token/login/",
+            {"email": user.email, "password": "benchmark-password"},
+            anonymous=True,
+        ),
+        Scenario("ingredients-list", "get", "/api/ingredients/"),
+        Scenario(
+            "ingredients-search",
+            "get",
+            "/api/ingredients/",
+            {"name": "ингредиент 001"},
+        ),
+        Scenario(
+            "ingredients-detail", "get", f"/api/ingredients/{ingredient.id}/"
+        ),
+        Scenario("recipes-list", "get", "/api/recipes/?limit=6"),
+        Scenario("recipes-list-100", "get", "/api/recipes/?limit=100"),
+        Scenario(
+            "recipes-list-anonymous",
+            "get",
+            "/api/recipes/?limit=6",
+            anonymous=True,
+        ),
+        Scenario("recipes-cursor", "get", "/api/recipes/?cursor=&limit=6"),
+        Scenario("recipes-feed", "get", "/api/recipes/feed/?limit=6"),
+        Scenario("recipes-favorited", "get", "/api/recipes/?is_favorited=1"),
+        Scenario(
+            "recipes-in-cart", "get", "/api/recipes/?is_in_shopping_cart=1"
+        ),
+        Scenario("recipes-author", "get", f"/api/recipes/?author={other.id}"),
+        Scenario(
+            "recipes-search",
+            "get",
+            "/api/recipes/",
+            {"search": "рецепт 1", "limit": 6},
+        ),
+        Scenario(
+            "recipes-by-ingredients",
+            "get",
+            "/api/recipes/by_ingredients/",
+            {
+                "ingredients": ",".join(map(str, ingredient_ids[:5])),
+                "limit": 6,
+            },
+        ),
+        Scenario("recipes-detail", "get", f"/api/recipes/{recipe.id}/"),
+        Scenario(
+            "recipes-get-link", "get", f"/api/recipes/{recipe.id}/get-link/"
+        ),
+        Scenario(
+            "recipes-similar", "get", f"/api/recipes/{recipe.id}/similar/"
+        ),
+        Scenario("recipes-recommended", "get", "/api/recipes/recommended/"),
+        Scenario("recipes-create", "post", "/api/recipes/", recipe_payload),
+        Scenario(
+            "recipes-create-20",
+            "post",
+            "/api/recipes/",
+            {
+                **recipe_payload,
+                "ingredients": [
+                    {"id": pk, "amount": 10} for pk in ingredient_ids
+                ],
+            },
+        ),
+        Scenario(
+            "recipes-update",
+            "patch",
+            f"/api/recipes/{own_recipe.id}/",
+            recipe_payload,
+        ),
+        Scenario(
+            "recipes-favorite",
+            "post",
+            f"/api/recipes/{recipe.id}/favorite/",
+            teardown=("delete", f"/api/recipes/{recipe.id}/favorite/"),
+        ),
+        Scenario(
+            "recipes-shopping-cart",
+            "post",
+            f"/api/recipes/{recipe.id}/shopping_cart/",
+            teardown=("delete", f"/api/recipes/{recipe.id}/shopping_cart/"),
+        ),
+        Scenario(
+            "recipes-shopping-cart-bulk",
+            "post",
+            "/api/recipes/shopping_cart/bulk/",
+            {"ids": bulk_ids},
+            teardown=(
+                "delete",
+                "/api/recipes/shopping_cart/bulk/",
+                {"ids": bulk_ids},
+            ),
+        ),
+        Scenario(
+            "recipes-favorite-bulk",
+            "post",
+            "/api/recipes/favorite/bulk/",
+            {"ids": bulk_ids},
+            teardown=(
+                "delete",
+                "/api/recipes/favorite/bulk/",
+                {"ids": bulk_ids},
+            ),
+        ),
+        Scenario(
+            "recipes-download-shopping-cart",
+            "get",
+            "/api/recipes/download_shopping_cart/",
+        ),
+    ]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_scenario(scenario, client, anonymous_client, iterations):
+    """
+    Выполняет сценарий iterations раз после одного прогрева и возвращает
+    максимум запросов к БД, p50/p95 задержки в мс и размер ответа.
+    """
+    http = anonymous_client if scenario.anonymous else client
+    queries, timings, size = [], [], 0
+    for iteration in range(iterations + 1):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(http, scenario.method)(
+                scenario.path, scenario.data, format="json"
+            )
+            content = (
+                b"".join(response.streaming_content)
+                if response.streaming
+                else response.content
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+        query_count = len(captured)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f"{scenario.name}: HTTP {response.status_code} {content[:200]}"
+            )
+        if scenario.teardown:
+            method, path, *data = scenario.teardown
+            getattr(http, method)(path, *data, format="json")
+        elif scenario.name.startswith("recipes-create"):
+            Recipe.objects.filter(pk=response.json()["id"]).delete()
+        if iteration:
+            queries.append(query_count)
+            timings.append(elapsed)
+            size = len(content)
+    return {
+        "queries": max(queries),
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "bytes": size,
+    }
+
+
+def run_benchmark(size, iterations):
+    users = seed_dataset(size)
+    user = max(users, key=lambda item: item.recipes.count())
+    other = next(
+        author
+        for author in users
+        if author != user
+        and not Subscription.objects.filter(user=user, author=author).exists()
+    )
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    anonymous_client = APIClient()
+    return {
+        scenario.name: run_scenario(
+            scenario, client, anonymous_client, iterations
+        )
+        for scenario in build_scenarios(user, other)
+    }
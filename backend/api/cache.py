@@ -0,0 +1,107 @@
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .metrics import CACHE_REQUESTS
+
+
+class RecipeResponseCache:
+    """
+    Кэш ответов списка и карточки рецепта для анонимных пользователей.
+
+    Ключ включает поколения: "all" сбрасывает весь кэш, "list" — все
+    страницы списка, "recipe:<id>" — карточку одного рецепта. Сброс —
+    это запись нового поколения, старые записи просто истекают.
+    Поколения лежат в том же кэше, поэтому сброс из другого воркера или
+    из import_recipes виден только при общем кэше (REDIS_URL).
+    """
+
+    prefix = "recipes:response"
+
+    @property
+    def cache(self):
+        return caches[settings.RECIPE_CACHE_ALIAS]
+
+    def _generation_keys(self, names):
+        return [f"{self.prefix}:gen:{name}" for name in names]
+
+    def _generations(self, *names):
+        keys = self._generation_keys(names)
+        found = self.cache.get_many(keys)
+        missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+        if missing:
+            self.cache.set_many(missing, timeout=None)
+            found.update(missing)
+        return ":".join(found[key] for key in keys)
+
+    def _bump(self, *names):
+        self.cache.set_many(
+            {key: uuid.uuid4().hex for key in self._generation_keys(names)},
+            timeout=None,
+        )
+
+    def make_key(self, request, recipe_id=None):
+        origin = f"{request.scheme}://{request.get_host()}"
+        if recipe_id is None:
+            generations = self._generations("all", "list")
+            query = urlencode(sorted(request.query_params.lists()), doseq=True)
+            raw = f"list:{origin}?{query}"
+        else:
+            generations = self._generations("all", f"recipe:{recipe_id}")
+            raw = f"detail:{origin}:{recipe_id}"
+        digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+        return f"{self.prefix}:{generations}:{digest}"
+
+    def _count(self, name):
+        CACHE_REQUESTS.labels("recipe_responses", name[:-2]).inc()
+        key = f"{self.prefix}:stats:{name}"
+        self.cache.add(key, 0, timeout=None)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.set(key, 1, timeout=None)
+
+    def fetch(self, request, render, recipe_id=None):
+        """
+        Отдаёт закэшированный ответ или вызывает render() и кэширует
+        успешный результат. Авторизованные запросы идут мимо кэша.
+        """
+        if not request.user.is_anonymous:
+            return render()
+        key = self.make_key(request, recipe_id)
+        data = self.cache.get(key)
+        if data is not None:
+            self._count("hits")
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+        self._count("misses")
+        response = render()
+        if response.status_code == 200:
+            self.cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
+
+    def invalidate_recipes(self, recipe_ids):
+        self._bump("list", *(f"recipe:{pk}" for pk in recipe_ids))
+
+    def invalidate_all(self):
+        self._bump("all")
+
+    def stats(self):
+        keys = [f"{self.prefix}:stats:{name}" for name in ("hits", "misses")]
+        found = self.cache.get_many(keys)
+        hits, misses = (found.get(key, 0) for key in keys)
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+        }
+
+
+recipe_cache = RecipeResponseCache()
@@ -0,0 +1,187 @@
+import csv
+import datetime
+import json
+from io import BytesIO
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.negotiation import DefaultContentNegotiation
+
+EXPORT_CHUNK_SIZE = 500
+
+
+class IgnoreFormatNegotiation(DefaultContentNegotiation):
+    """
+    Параметр ?format= у выгрузки выбирает формат файла, а не рендерер DRF.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class Echo:
+    """Псевдо-буфер: csv.writer пишет строку, а мы сразу её отдаём."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingCartExporter:
+    """
+    Собирает список покупок из двух ленивых выборок и отдаёт его частями.
+    ingredients — словари name/measurement_unit/total,
+    recipes — пары (название рецепта, автор).
+    """
+
+    content_type = "text/plain; charset=utf-8"
+    extension = "txt"
+
+    def __init__(self, ingredients, recipes):
+        self.ingredients = ingredients
+        self.recipes = recipes
+        self.date = datetime.date.today().strftime("%d.%m.%Y")
+
+    @property
+    def filename(self):
+        return f"shopping_cart.{self.extension}"
+
+    def iter_ingredients(self):
+        return self.ingredients.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    def iter_recipes(self):
+        return self.recipes.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    def stream(self):
+        raise NotImplementedError
+
+
+class TxtExporter(ShoppingCartExporter):
+    def stream(self):
+        yield f"Список покупок — {self.date}\n\nИнгредиенты:\n"
+        for idx, ing in enumerate(self.iter_ingredients(), 1):
+            yield (
+                f"{idx}. {ing['name'].capitalize()} "
+                f"({ing['measurement_unit']}) — {ing['total']}\n"
+            )
+        yield "\nРецепты:\n"
+        for idx, (name, author) in enumerate(self.iter_recipes(), 1):
+            yield f"{idx}. {name} — {author}\n"
+
+
+class CsvExporter(ShoppingCartExporter):
+    content_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def stream(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(("Ингредиент", "Единица измерения", "Всего"))
+        for ing in self.iter_ingredients():
+            yield writer.writerow(
+                (ing["name"], ing["measurement_unit"], ing["total"])
+            )
+        yield writer.writerow(())
+        yield writer.writerow(("Рецепт", "Автор"))
+        for name, author in self.iter_recipes():
+            yield writer.writerow((name, author))
+
+
+class JsonExporter(ShoppingCartExporter):
+    content_type = "application/json"
+    extension = "json"
+
+    @staticmethod
+    def _stream_array(items):
+        separator = ""
+        for item in items:
+            yield separator + json.dumps(item, ensure_ascii=False)
+            separator = ", "
+
+    def stream(self):
+        yield f'{{"date": "{self.date}", "ingredients": ['
+        yield from self._stream_array(
+            {
+                "name": ing["name"],
+                "measurement_unit": ing["measurement_unit"],
+                "total": ing["total"],
+            }
+            for ing in self.iter_ingredients()
+        )
+        yield '], "recipes": ['
+        yield from self._stream_array(
+            {"name": name, "author": author}
+            for name, author in self.iter_recipes()
+        )
+        yield "]}"
+
+
+class PdfExporter(ShoppingCartExporter):
+    """
+    PDF не поддерживает дозапись, поэтому документ собирается целиком и
+    отдаётся одним куском. Нужны reportlab и TTF-шрифт с кириллицей.
+    """
+
+    content_type = "application/pdf"
+    extension = "pdf"
+    font_name = "ShoppingCartFont"
+
+    def __init__(self, ingredients, recipes):
+        super().__init__(ingredients, recipes)
+        try:
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.SHOPPING_CART_PDF_FONT)
+            )
+        except Exception:
+            raise serializers.ValidationError(
+                "Выгрузка в pdf недоступна на сервере"
+            )
+
+    def stream(self):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+
+        buffer = BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        y = height - 50
+
+        def line(text, size=11):
+            nonlocal y
+            if y < 50:
+                pdf.showPage()
+                y = height - 50
+            pdf.setFont(self.font_name, size)
+            pdf.drawString(40, y, text)
+            y -= size + 7
+
+        line(f"Список покупок — {self.date}", size=14)
+        line("Ингредиенты:", size=12)
+        for idx, ing in enumerate(self.iter_ingredients(), 1):
+            line(
+                f"{idx}. {ing['name'].capitalize()} "
+                f"({ing['measurement_unit']}) — {ing['total']}"
+            )
+        line("Рецепты:", size=12)
+        for idx, (name, author) in enumerate(self.iter_recipes(), 1):
+            line(f"{idx}. {name} — {author}")
+        pdf.save()
+        yield buffer.getvalue()
+
+
+EXPORTERS = {
+    "txt": TxtExporter,
+    "csv": CsvExporter,
+    "json": JsonExporter,
+    "pdf": PdfExporter,
+}
+
+
+def get_exporter(export_format, ingredients, recipes):
+    exporter_class = EXPORTERS.get(export_format or "txt")
+    if exporter_class is None:
+        raise serializers.ValidationError(
+            f"Неизвестный формат выгрузки. Доступны: {', '.join(EXPORTERS)}"
+        )
+    return exporter_class(ingredients, recipes)
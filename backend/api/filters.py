@@ -2,6 +2,7 @@ import django_filters
 from django_filters.rest_framework import CharFilter, FilterSet
 
 from recipes.models import Ingredient, Recipe
+from recipes.search import get_recipe_search
 
 
 class IngredientFilter(FilterSet):
@@ -18,6 +19,7 @@ class RecipeFilter(django_filters.FilterSet):
     )
     is_favorited = django_filters.NumberFilter(method="filter_is_favorited")
     author = django_filters.NumberFilter(field_name="author__id")
+    search = CharFilter(method="filter_search")
 
     def filter_is_in_shopping_cart(self, recipes, name, value):
         user = getattr(self.request, "user", None)
@@ -31,6 +33,13 @@ class RecipeFilter(django_filters.FilterSet):
             return recipes.filter(favorites__user=user)
         return recipes
 
+    def filter_search(self, recipes, name, value):
+        """
+        Полнотекстовый поиск, сортировка по релевантности. С параметром
+        cursor порядок задаёт keyset-пагинация (по дате).
+        """
+        return get_recipe_search().search(recipes, value)
+
     class Meta:
         model = Recipe
         fields = ("author", "is_favorited", "is_in_shopping_cart")
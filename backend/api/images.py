@@ -0,0 +1,273 @@
+import binascii
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+from tempfile import SpooledTemporaryFile
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+from .cache import recipe_cache
+from .metrics import IMAGE_UPLOAD_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Варианты: имя -> (ширина, высота, режим). "fit" обрезает под пропорции,
+# "contain" вписывает картинку целиком.
+RECIPE_IMAGE_VARIANTS = {
+    "card": (480, 360, "fit"),
+    "detail": (1200, 900, "contain"),
+}
+AVATAR_IMAGE_VARIANTS = {
+    "64": (64, 64, "fit"),
+}
+# Формат Pillow -> расширение файла при приёме картинки
+UPLOAD_FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+# Кратно 4, чтобы каждый кусок base64 декодировался независимо
+DECODE_CHUNK_SIZE = 64 * 1024
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PIPELINE_WORKERS,
+            thread_name_prefix="image-pipeline",
+        )
+    return _executor
+
+
+def encode(image):
+    """Перекодирует картинку без метаданных в IMAGE_PIPELINE_FORMAT."""
+    image_format = settings.IMAGE_PIPELINE_FORMAT
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=settings.IMAGE_PIPELINE_QUALITY)
+    return buffer.getvalue()
+
+
+def resize(image, width, height, mode):
+    if mode == "fit":
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    image = image.copy()
+    image.thumbnail((width, height), Image.Resampling.LANCZOS)
+    return image
+
+
+def build_variants(name, variants):
+    """
+    Перекодирует оригинал name и строит уменьшенные копии.
+    Возвращает имя нового оригинала и словарь {вариант: имя файла}.
+    """
+    extension = settings.IMAGE_PIPELINE_FORMAT.lower()
+    path = PurePosixPath(name)
+    stem = str(path.with_suffix(""))
+    with default_storage.open(name) as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    side = settings.IMAGE_PIPELINE_MAX_SIDE
+    original = resize(image, side, side, "contain")
+    new_name = default_storage.save(
+        f"{stem}.{extension}", ContentFile(encode(original))
+    )
+    built = {
+        variant: default_storage.save(
+            f"{stem}_{variant}.{extension}",
+            ContentFile(encode(resize(image, width, height, mode))),
+        )
+        for variant, (width, height, mode) in variants.items()
+    }
+    return new_name, built
+
+
+def delete_files(names):
+    for name in names:
+        if name and default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def discard_image(name, variants):
+    """Удаляет прежнюю картинку name и её копии после коммита транзакции."""
+    names = [name, *(variants or {}).values()]
+    if any(names):
+        transaction.on_commit(lambda: delete_files(names))
+
+
+def process(model_label, pk, field_name):
+    """
+    Фоновая обработка файла из поля field_name объекта pk.
+    Результат записывается условным UPDATE: если картинку за это время
+    заменили, сгенерированные файлы удаляются, иначе удаляется исходный
+    файл загрузки с метаданными и прежние копии.
+    """
+    model = apps.get_model(model_label)
+    variants_field, variants, invalidate = PIPELINES[model_label]
+    try:
+        row = (
+            model.objects.filter(pk=pk)
+            .values_list(field_name, variants_field)
+            .first()
+        )
+        if row is None or not row[0]:
+            return
+        name, old_variants = row
+        new_name, built = build_variants(name, variants)
+        updated = model.objects.filter(pk=pk, **{field_name: name}).update(
+            **{field_name: new_name, variants_field: built}
+        )
+        if not updated:
+            delete_files([new_name, *built.values()])
+            return
+        delete_files(
+            {name, *(old_variants or {}).values()}
+            - {new_name, *built.values()}
+        )
+        invalidate(pk)
+    except Exception:
+        logger.exception(
+            "Image processing failed for %s pk=%s", model_label, pk
+        )
+
+
+def process_in_thread(model_label, pk, field_name):
+    try:
+        process(model_label, pk, field_name)
+    finally:
+        connections.close_all()
+
+
+def schedule(instance, field_name):
+    """
+    Ставит обработку картинки в очередь после коммита транзакции.
+    При IMAGE_PIPELINE_ENABLED=False картинка остаётся необработанной
+    до запуска process_images.
+    """
+    if not settings.IMAGE_PIPELINE_ENABLED:
+        return
+    model_label = instance._meta.label
+    pk = instance.pk
+
+    def submit():
+        if settings.IMAGE_PIPELINE_SYNC:
+            process(model_label, pk, field_name)
+        else:
+            get_executor().submit(
+                process_in_thread, model_label, pk, field_name
+            )
+
+    transaction.on_commit(submit)
+
+
+def ingest_base64_image(value, field="image"):
+    """
+    Принимает картинку в виде data:image/...;base64,... и возвращает
+    File во временном файле (в памяти до IMAGE_UPLOAD_SPOOL_BYTES).
+
+    Строка декодируется один раз кусками, размер проверяется до
+    декодирования, разрешение — по заголовку до разбора пикселей.
+    """
+    if not isinstance(value, str) or not value.startswith("data:image/"):
+        raise serializers.ValidationError("Некорректный формат картинки")
+    _, separator, payload = value.partition(";base64,")
+    if not separator:
+        raise serializers.ValidationError("Некорректный формат картинки")
+    max_bytes = settings.IMAGE_UPLOAD_MAX_BYTES
+    if len(payload) // 4 * 3 > max_bytes:
+        raise serializers.ValidationError(
+            f"Размер картинки превышает {max_bytes // 1024} КБ"
+        )
+
+    spooled = SpooledTemporaryFile(max_size=settings.IMAGE_UPLOAD_SPOOL_BYTES)
+    try:
+        extension, size = _spool_image(payload, spooled)
+    except BaseException:
+        spooled.close()
+        raise
+    IMAGE_UPLOAD_BYTES.labels(field).observe(size)
+    spooled.seek(0)
+    return File(spooled, name=f"{uuid.uuid4()}.{extension}")
+
+
+def _spool_image(payload, spooled):
+    """
+    Декодирует payload в spooled и проверяет заголовок картинки.
+    Возвращает расширение файла и размер декодированных данных.
+    """
+    for start in range(0, len(payload), DECODE_CHUNK_SIZE):
+        end = start + DECODE_CHUNK_SIZE
+        try:
+            chunk = binascii.a2b_base64(payload[start:end], strict_mode=True)
+        except binascii.Error:
+            raise serializers.ValidationError(
+                "Не удалось декодировать изображение"
+            )
+        spooled.write(chunk)
+    size = spooled.tell()
+    spooled.seek(0)
+    try:
+        with Image.open(spooled) as image:
+            if image.format not in UPLOAD_FORMATS:
+                raise serializers.ValidationError(
+                    "Некорректный формат картинки"
+                )
+            width, height = image.size
+            if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+                raise serializers.ValidationError(
+                    "Слишком большое разрешение картинки"
+                )
+            image.verify()
+            return UPLOAD_FORMATS[image.format], size
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise serializers.ValidationError(
+            "Не удалось декодировать изображение"
+        )
+
+
+def variant_urls(request, variants):
+    urls = {
+        variant: default_storage.url(name)
+        for variant, name in (variants or {}).items()
+    }
+    if request is None:
+        return urls
+    return {
+        variant: request.build_absolute_uri(url)
+        for variant, url in urls.items()
+    }
+
+
+def invalidate_recipe(pk):
+    recipe_cache.invalidate_recipes([pk])
+
+
+def invalidate_author(pk):
+    Recipe = apps.get_model("recipes.Recipe")
+    recipe_cache.invalidate_recipes(
+        Recipe.objects.filter(author_id=pk).values_list("id", flat=True)
+    )
+
+
+PIPELINES = {
+    "recipes.Recipe": (
+        "image_variants",
+        RECIPE_IMAGE_VARIANTS,
+        invalidate_recipe,
+    ),
+    "users.User": (
+        "avatar_variants",
+        AVATAR_IMAGE_VARIANTS,
+        invalidate_author,
+    ),
+}
@@ -0,0 +1,135 @@
+import json
+import tempfile
+from dataclasses import fields
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from api.benchmark import DatasetSize, run_benchmark
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "api.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset in a throwaway test database, call every "
+        "API route and compare query counts and latency with a baseline"
+    )
+
+    def add_arguments(self, parser):
+        for field in fields(DatasetSize):
+            parser.add_argument(
+                f"--{field.name.replace('_', '-')}",
+                type=int,
+                default=field.default,
+            )
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--baseline",
+            type=Path,
+            default=DEFAULT_BASELINE,
+            help=f"Baseline JSON file (default {DEFAULT_BASELINE})",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Write the measured results as the new baseline",
+        )
+        parser.add_argument(
+            "--latency-tolerance",
+            type=float,
+            default=None,
+            help="Also fail when p95 grows by more than this fraction "
+            "(e.g. 0.5); latency depends on the machine, so it is off "
+            "by default",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Запускает бенчмарк на отдельной тестовой базе, печатает таблицу и
+        падает, если маршрут стал делать больше запросов, чем в baseline.
+        """
+        size = DatasetSize(
+            **{
+                field.name: options[field.name]
+                for field in fields(DatasetSize)
+            }
+        )
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with tempfile.TemporaryDirectory() as media_root:
+                # Обработка картинок выключена: её потоки пишут в ту же
+                # базу и искажают задержки, а синхронно её запросы попали
+                # бы в число запросов маршрута.
+                with override_settings(
+                    MEDIA_ROOT=media_root, IMAGE_PIPELINE_ENABLED=False
+                ):
+                    for cache in caches.all():
+                        cache.clear()
+                    results = run_benchmark(size, options["iterations"])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{'route':<32}{'queries':>8}{'p50 ms':>10}"
+            f"{'p95 ms':>10}{'bytes':>10}"
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<32}{row['queries']:>8}{row['p50_ms']:>10.2f}"
+                f"{row['p95_ms']:>10.2f}{row['bytes']:>10}"
+            )
+
+        baseline_path = options["baseline"]
+        if options["save_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(
+                json.dumps(results, indent=2, ensure_ascii=False) + "\n"
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Baseline saved to {baseline_path}.")
+            )
+            return
+        if not baseline_path.exists():
+            self.stdout.write(
+                self.style.WARNING(
+                    f"No baseline at {baseline_path}, nothing to compare."
+                )
+            )
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        tolerance = options["latency_tolerance"]
+        regressions = []
+        for name, row in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if row["queries"] > expected["queries"]:
+                regressions.append(
+                    f"{name}: {row['queries']} queries "
+                    f"(baseline {expected['queries']})"
+                )
+            if tolerance is not None and row["p95_ms"] > expected["p95_ms"] * (
+                1 + tolerance
+            ):
+                regressions.append(
+                    f"{name}: p95 {row['p95_ms']:.2f} ms "
+                    f"(baseline {expected['p95_ms']:.2f} ms)"
+                )
+        if regressions:
+            raise CommandError(
+                "Performance regressions:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions."))
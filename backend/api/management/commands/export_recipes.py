@@ -0,0 +1,95 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from recipes.models import IngredientInRecipe, Recipe
+
+
+class Command(BaseCommand):
+    help = "Export recipes as JSON Lines (one recipe per line)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default="-",
+            help="Output path, '-' for stdout (default)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Recipes fetched from the database per round trip",
+        )
+
+    @staticmethod
+    def serialize(recipe):
+        return {
+            "author": recipe.author.email,
+            "name": recipe.name,
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "image": recipe.image.name,
+            "ingredients": [
+                {
+                    "name": item.ingredient.name,
+                    "measurement_unit": item.ingredient.measurement_unit,
+                    "amount": item.amount,
+                }
+                for item in recipe.ingredient_amounts.all()
+            ],
+        }
+
+    def handle(self, *args, **options):
+        """
+        Выгружает рецепты потоком: рецепты читаются пачками через
+        iterator(), ингредиенты подгружаются одним запросом на пачку.
+        """
+        batch_size = options["batch_size"]
+        recipes = (
+            Recipe.objects.select_related("author")
+            .prefetch_related(
+                Prefetch(
+                    "ingredient_amounts",
+                    queryset=IngredientInRecipe.objects.select_related(
+                        "ingredient"
+                    ).order_by("id"),
+                )
+            )
+            .order_by("id")
+            .iterator(chunk_size=batch_size)
+        )
+        output = (
+            sys.stdout
+            if options["file"] == "-"
+            else open(options["file"], "w", encoding="utf-8")
+        )
+        # Прогресс пишется в stderr, чтобы не смешиваться с выгрузкой.
+        progress = self.stderr if options["file"] == "-" else self.stdout
+        started = time.monotonic()
+        count = 0
+        try:
+            for recipe in recipes:
+                output.write(
+                    json.dumps(self.serialize(recipe), ensure_ascii=False)
+                )
+                output.write("\n")
+                count += 1
+                if count % batch_size == 0:
+                    progress.write(f"Exported {self.rate(count, started)}")
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        progress.write(
+            self.style.SUCCESS(f"Exported {self.rate(count, started)}")
+        )
+
+    @staticmethod
+    def rate(count, started):
+        elapsed = time.monotonic() - started
+        return (
+            f"{count} recipes in {elapsed:.1f}s "
+            f"({count / elapsed if elapsed else 0:.0f} recipes/s)"
+        )
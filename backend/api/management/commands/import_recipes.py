@@ -0,0 +1,203 @@
+import json
+import sys
+import time
+from collections import Counter
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.cache import recipe_cache
+from recipes.counters import INGREDIENT_RECIPES, USER_RECIPES
+from recipes.coverage import record_changes
+from recipes.feed import fan_out_recipes
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+from recipes.search import get_recipe_search
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Import recipes from JSON Lines produced by export_recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default="-",
+            help="Input path, '-' for stdin (default)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Recipes inserted per bulk_create",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10,
+            help="Batches committed per transaction",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Загружает рецепты потоком: строки читаются пачками по
+        batch_size, каждые chunk_size пачек — отдельная транзакция.
+        Авторы ищутся по email, ингредиенты — по словарю
+        (название, единица), загруженному один раз.
+        """
+        batch_size = options["batch_size"]
+        chunk_size = options["chunk_size"]
+        if batch_size < 1 or chunk_size < 1:
+            raise CommandError("Batch and chunk sizes must be positive.")
+
+        self.ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            ).iterator()
+        }
+        self.inserted = self.skipped = 0
+        started = time.monotonic()
+        source = (
+            sys.stdin
+            if options["file"] == "-"
+            else open(options["file"], encoding="utf-8")
+        )
+        try:
+            batches = self.batches(enumerate(source, 1), batch_size)
+            while chunk := list(islice(batches, chunk_size)):
+                with transaction.atomic():
+                    for batch in chunk:
+                        self.insert_batch(batch)
+                self.stdout.write(self.progress(started))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        if self.inserted:
+            recipe_cache.invalidate_all()
+        self.stdout.write(self.style.SUCCESS(self.progress(started)))
+        if self.inserted:
+            self.stdout.write(
+                "Run process_images to build thumbnails for new recipes."
+            )
+
+    def progress(self, started):
+        elapsed = time.monotonic() - started
+        rate = self.inserted / elapsed if elapsed else 0
+        return (
+            f"Imported {self.inserted}, skipped {self.skipped} "
+            f"in {elapsed:.1f}s ({rate:.0f} recipes/s)"
+        )
+
+    def batches(self, lines, batch_size):
+        batch = []
+        for line_number, line in lines:
+            if not line.strip():
+                continue
+            batch.append((line_number, line))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def parse(self, record, authors):
+        """Возвращает рецепт и [(ingredient_id, amount)] или ValueError."""
+        try:
+            author_id = authors[record["author"]]
+            amounts = [
+                (
+                    self.ingredients[(item["name"], item["measurement_unit"])],
+                    int(item["amount"]),
+                )
+                for item in record["ingredients"]
+            ]
+            recipe = Recipe(
+                author_id=author_id,
+                name=record["name"],
+                text=record["text"],
+                cooking_time=int(record["cooking_time"]),
+                image=record.get("image") or "",
+            )
+            recipe.full_clean(
+                exclude=("author",),
+                validate_unique=False,
+                validate_constraints=False,
+            )
+        except ValidationError as exc:
+            raise ValueError("; ".join(exc.messages))
+        except KeyError as exc:
+            raise ValueError(f"unknown or missing {exc}")
+        except (TypeError, AttributeError) as exc:
+            raise ValueError(exc)
+        ingredient_ids = [ingredient_id for ingredient_id, _ in amounts]
+        if not amounts or len(set(ingredient_ids)) != len(ingredient_ids):
+            raise ValueError("ingredients are empty or repeated")
+        if min(amount for _, amount in amounts) < 1:
+            raise ValueError("amounts must be positive")
+        return recipe, amounts
+
+    def skip(self, line_number, reason):
+        self.skipped += 1
+        self.stderr.write(f"Line {line_number} skipped: {reason}")
+
+    def insert_batch(self, batch):
+        records = []
+        for line_number, line in batch:
+            try:
+                records.append((line_number, json.loads(line)))
+            except ValueError as exc:
+                self.skip(line_number, exc)
+        emails = {
+            record["author"]
+            for _, record in records
+            if isinstance(record, dict)
+            and isinstance(record.get("author"), str)
+        }
+        authors = {
+            email: user.pk
+            for email, user in User.objects.in_bulk(
+                emails, field_name="email"
+            ).items()
+        }
+        recipes, amounts = [], []
+        for line_number, record in records:
+            try:
+                recipe, recipe_amounts = self.parse(record, authors)
+            except ValueError as exc:
+                self.skip(line_number, exc)
+                continue
+            recipes.append(recipe)
+            amounts.append(recipe_amounts)
+        if not recipes:
+            return
+        Recipe.objects.bulk_create(recipes)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe_id=recipe.pk, ingredient_id=ingredient_id, amount=amount
+            )
+            for recipe, recipe_amounts in zip(recipes, amounts)
+            for ingredient_id, amount in recipe_amounts
+        )
+        USER_RECIPES.apply(Counter(recipe.author_id for recipe in recipes))
+        INGREDIENT_RECIPES.apply(
+            Counter(
+                ingredient_id
+                for recipe_amounts in amounts
+                for ingredient_id, _ in recipe_amounts
+            )
+        )
+        get_recipe_search().index(recipe.pk for recipe in recipes)
+        transaction.on_commit(
+            lambda: record_changes(recipe.pk for recipe in recipes)
+        )
+        transaction.on_commit(
+            lambda: fan_out_recipes(
+                [
+                    (recipe.pk, recipe.author_id, recipe.created)
+                    for recipe in recipes
+                ]
+            )
+        )
+        self.inserted += len(recipes)
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from api.images import process
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Re-encode images and build thumbnail variants synchronously"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Reprocess every image, not only those without variants",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Обрабатывает картинки, до которых не дошла фоновая очередь
+        (например, после рестарта воркера), или все с --all.
+        """
+        for model, field_name, variants_field in (
+            (Recipe, "image", "image_variants"),
+            (User, "avatar", "avatar_variants"),
+        ):
+            pending = model.objects.exclude(
+                **{f"{field_name}__isnull": True}
+            ).exclude(**{field_name: ""})
+            if not options["all"]:
+                pending = pending.filter(**{variants_field: {}})
+            count = 0
+            for pk in pending.values_list("pk", flat=True).iterator():
+                process(model._meta.label, pk, field_name)
+                count += 1
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model._meta.verbose_name_plural}: processed {count}."
+                )
+            )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import recipe_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the anonymous recipe response cache"
+
+    def handle(self, *args, **options):
+        stats = recipe_cache.stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"hit_ratio={stats['hit_ratio']:.3f}"
+        )
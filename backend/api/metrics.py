@@ -0,0 +1,127 @@
+import os
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUEST_DURATION = Histogram(
+    "foodgram_http_request_duration_seconds",
+    "Request duration by DRF route name",
+    ["route", "method"],
+)
+REQUESTS = Counter(
+    "foodgram_http_requests",
+    "Requests by DRF route name and status",
+    ["route", "method", "status"],
+)
+DB_QUERIES = Counter(
+    "foodgram_db_queries",
+    "SQL queries executed while handling requests",
+    ["route"],
+)
+DB_QUERY_SECONDS = Counter(
+    "foodgram_db_query_seconds",
+    "Time spent in SQL queries while handling requests",
+    ["route"],
+)
+CACHE_REQUESTS = Counter(
+    "foodgram_cache_requests",
+    "Cache lookups by result (hit/miss)",
+    ["cache", "result"],
+)
+IMAGE_UPLOAD_BYTES = Histogram(
+    "foodgram_image_upload_bytes",
+    "Decoded size of uploaded base64 images",
+    ["field"],
+    buckets=(
+        16 * 1024,
+        64 * 1024,
+        256 * 1024,
+        512 * 1024,
+        1024 * 1024,
+        2 * 1024 * 1024,
+        5 * 1024 * 1024,
+        10 * 1024 * 1024,
+    ),
+)
+CART_EXPORT_DURATION = Histogram(
+    "foodgram_shopping_cart_export_seconds",
+    "Time to stream a shopping cart export to the client",
+    ["format"],
+)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def route_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "unmatched"
+
+
+class MetricsMiddleware:
+    """Время, статус и число SQL-запросов по имени маршрута DRF."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        route = route_name(request)
+        REQUEST_DURATION.labels(route, request.method).observe(
+            time.perf_counter() - started
+        )
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        DB_QUERIES.labels(route).inc(queries.count)
+        DB_QUERY_SECONDS.labels(route).inc(queries.seconds)
+        return response
+
+
+def observe_export(chunks, export_format):
+    """Отдаёт chunks дальше и замеряет время до последнего куска."""
+    started = time.perf_counter()
+    yield from chunks
+    CART_EXPORT_DURATION.labels(export_format).observe(
+        time.perf_counter() - started
+    )
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus. При нескольких воркерах
+    gunicorn значения собираются из PROMETHEUS_MULTIPROC_DIR.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
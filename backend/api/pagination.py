@@ -1,7 +1,141 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class LimitPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "limit"
     max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу (keyset): страница выбирается условием по полям
+    view.keyset_fields от новых к старым, без OFFSET и COUNT(*).
+    Ответ сохраняет поля next/previous/results, но без count.
+    """
+
+    page_size = LimitPagination.page_size
+    page_size_query_param = LimitPagination.page_size_query_param
+    max_page_size = LimitPagination.max_page_size
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Некорректный курсор"
+
+    def get_page_size(self, request):
+        limit = request.query_params.get(self.page_size_query_param, "")
+        if limit.isdigit() and int(limit) > 0:
+            return min(int(limit), self.max_page_size)
+        return self.page_size
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, cursor["p"], strict=True)
+            ]
+            return position, bool(cursor["r"])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverse):
+        position = [getattr(item, field) for field in self.fields]
+        cursor = json.dumps(
+            {
+                "p": [
+                    value.isoformat() if hasattr(value, "isoformat") else value
+                    for value in position
+                ],
+                "r": int(reverse),
+            }
+        )
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            base64.urlsafe_b64encode(cursor.encode()).decode(),
+        )
+
+    def keyset_condition(self, position, lookup):
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            condition |= Q(
+                **dict(zip(self.fields[:index], position[:index])),
+                **{f"{field}__{lookup}": position[index]},
+            )
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.fields = tuple(view.keyset_fields)
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        if reverse:
+            queryset = queryset.order_by(*self.fields)
+        else:
+            queryset = queryset.order_by(*(f"-{f}" for f in self.fields))
+        if position is not None:
+            queryset = queryset.filter(
+                self.keyset_condition(position, "gt" if reverse else "lt")
+            )
+        page = list(queryset[: page_size + 1])
+        has_more = len(page) > page_size
+        page = page[:page_size]
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return replace_query_param(
+                self.base_url, self.cursor_query_param, ""
+            )
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Включает KeysetPagination, если в запросе передан параметр cursor
+    (пустой — первая страница). Иначе используется pagination_class.
+    """
+
+    keyset_fields = ()
+
+    @property
+    def paginator(self):
+        query_params = getattr(self.request, "query_params", {})
+        if KeysetPagination.cursor_query_param not in query_params:
+            return super().paginator
+        if not isinstance(getattr(self, "_paginator", None), KeysetPagination):
+            self._paginator = KeysetPagination()
+        return self._paginator
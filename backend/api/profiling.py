@@ -0,0 +1,157 @@
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar("current_profile", default=None)
+
+
+class RequestProfile:
+    """Замеры одного запроса: время, SQL-запросы и сериализация."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = Counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.slow_queries = []
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        """execute_wrapper: считает запросы и их время."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.query_count += 1
+            self.db_time += elapsed
+            self.queries[sql] += 1
+            if elapsed * 1000 >= settings.PROFILING_SLOW_QUERY_MS:
+                self.slow_queries.append(
+                    {"sql": sql[:500], "ms": round(elapsed * 1000, 2)}
+                )
+
+    @contextmanager
+    def serializing(self):
+        """Вложенные сериализаторы учитываются внутри внешнего."""
+        self._serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._serializer_depth -= 1
+            if not self._serializer_depth:
+                self.serializer_time += time.perf_counter() - started
+
+    def duplicates(self):
+        """Одинаковые SQL-шаблоны, выполненные больше одного раза (N+1)."""
+        return {
+            sql[:500]: count
+            for sql, count in self.queries.most_common()
+            if count > 1
+        }
+
+
+def profiled_data(prop):
+    def data(self):
+        profile = current_profile.get()
+        if profile is None:
+            return prop.fget(self)
+        with profile.serializing():
+            return prop.fget(self)
+
+    data.profiled = True
+    return property(data)
+
+
+def instrument_serializers():
+    """Оборачивает Serializer.data и ListSerializer.data замером времени."""
+    for serializer_class in (
+        serializers.Serializer,
+        serializers.ListSerializer,
+    ):
+        prop = serializer_class.data
+        if not getattr(prop.fget, "profiled", False):
+            serializer_class.data = profiled_data(prop)
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 2)
+
+
+class ProfilingMiddleware:
+    """
+    Включается через PROFILING_ENABLED. Каждому ответу добавляет
+    Server-Timing, а в лог api.profiling пишет JSON по доле
+    PROFILING_SAMPLE_RATE запросов и по всем медленным.
+    Запросы к БД при отдаче StreamingHttpResponse не учитываются.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        instrument_serializers()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        total = time.perf_counter() - profile.started
+
+        response["Server-Timing"] = ", ".join(
+            (
+                f"total;dur={milliseconds(total)}",
+                f"db;dur={milliseconds(profile.db_time)};"
+                f'desc="{profile.query_count} queries"',
+                f"serializer;dur={milliseconds(profile.serializer_time)}",
+            )
+        )
+        slow = total * 1000 >= settings.PROFILING_SLOW_REQUEST_MS
+        if slow or random.random() < settings.PROFILING_SAMPLE_RATE:
+            self.log(request, response, profile, total, slow)
+        return response
+
+    @staticmethod
+    def log(request, response, profile, total, slow):
+        match = request.resolver_match
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "route": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": milliseconds(total),
+            "db_ms": milliseconds(profile.db_time),
+            "queries": profile.query_count,
+            "duplicate_queries": profile.duplicates(),
+            "slow_queries": profile.slow_queries,
+            "serializer_ms": milliseconds(profile.serializer_time),
+            "response_bytes": (
+                None if response.streaming else len(response.content)
+            ),
+            "slow": slow,
+        }
+        logger.log(
+            logging.WARNING if slow else logging.INFO,
+            json.dumps(record, ensure_ascii=False),
+        )
@@ -1,8 +1,4 @@
-import base64
-import uuid
-from io import BytesIO
-
-from django.core.files.base import ContentFile
+from django.db import transaction
 from djoser.serializers import (
     SetPasswordSerializer as DjoserSetPasswordSerializer,
 )
@@ -10,25 +6,48 @@ from djoser.serializers import (
     UserCreateSerializer as DjoserUserCreateSerializer,
 )
 from djoser.serializers import UserSerializer as DjoserUserSerializer
-from PIL import Image
 from rest_framework import serializers
 
+from recipes.counters import CART_AMOUNTS, INGREDIENT_RECIPES, batched
+from recipes.coverage import MODE_ANY, MODES
 from recipes.models import Ingredient, IngredientInRecipe, Recipe
 from users.models import Subscription, User
 
+from .images import (
+    discard_image,
+    ingest_base64_image,
+    schedule,
+    variant_urls,
+)
+
 SetPasswordSerializer = DjoserSetPasswordSerializer
 UserCreateSerializer = DjoserUserCreateSerializer
 
 
+def get_recipes_limit(request):
+    limit = request.query_params.get("recipes_limit")
+    if limit is not None and limit.isdigit():
+        return int(limit)
+    return None
+
+
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ("id", "name", "measurement_unit")
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии картинки, готовые к этому моменту."""
+
+    def to_representation(self, variants):
+        return variant_urls(self.context.get("request"), variants)
+
+
 class UserSerializer(DjoserUserSerializer):
     is_subscribed = serializers.SerializerMethodField()
     avatar = serializers.ImageField(read_only=True)
+    avatar_variants = ImageVariantsField()
 
     class Meta(DjoserUserSerializer.Meta):
         model = User
@@ -40,10 +59,13 @@ class UserSerializer(DjoserUserSerializer):
             "last_name",
             "is_subscribed",
             "avatar",
+            "avatar_variants",
         )
         read_only_fields = fields
 
     def get_is_subscribed(self, user: User) -> bool:
+        if hasattr(user, "is_subscribed"):
+            return user.is_subscribed
         request = self.context.get("request")
         return (
             request
@@ -58,44 +80,31 @@ class AvatarSerializer(serializers.Serializer):
     avatar = serializers.CharField()
 
     def validate_avatar(self, value):
-        if not value.startswith("data:image/"):
-            raise serializers.ValidationError("Некорректный формат картинки")
-        try:
-            format, imgstr = value.split(";base64,")
-            decoded_file = base64.b64decode(imgstr)
-            image = Image.open(BytesIO(decoded_file))
-            image.verify()
-        except Exception:
-            raise serializers.ValidationError(
-                "Не удалось декодировать изображение"
-            )
-        return value
+        return ingest_base64_image(value, "avatar")
 
     def save(self, **kwargs):
         user: User = self.context["request"].user
-        value: str = self.validated_data["avatar"]
-
-        header, imgstr = value.split(";base64,", 1)
-        extension = header.split("/")[-1]
-        decoded = base64.b64decode(imgstr)
+        avatar = self.validated_data["avatar"]
 
-        filename = f"{uuid.uuid4()}.{extension}"
-        user.avatar.save(filename, ContentFile(decoded), save=True)
+        discard_image(user.avatar.name, user.avatar_variants)
+        user.avatar_variants = {}
+        user.avatar.save(avatar.name, avatar, save=False)
+        user.save(update_fields=["avatar", "avatar_variants"])
+        schedule(user, "avatar")
         return user
 
 
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_variants", "cooking_time")
         read_only_fields = fields
 
 
 class UserWithRecipesSerializer(UserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        source="recipes.count", read_only=True
-    )
 
     class Meta(UserSerializer.Meta):
         model = User
@@ -103,16 +112,50 @@ class UserWithRecipesSerializer(UserSerializer):
         read_only_fields = fields
 
     def get_recipes(self, user):
-        request = self.context.get("request")
-        limit = request.query_params.get("recipes_limit")
-        qs = user.recipes.all()
-        if limit is not None and limit.isdigit():
-            qs = qs[: int(limit)]
+        if hasattr(user, "latest_recipes"):
+            qs = user.latest_recipes
+        else:
+            qs = user.recipes.all()
+            limit = get_recipes_limit(self.context.get("request"))
+            if limit is not None:
+                qs = qs[:limit]
         return RecipeMinifiedSerializer(
             qs, many=True, context=self.context
         ).data
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+
+class IngredientCoverageQuerySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=50,
+    )
+    mode = serializers.ChoiceField(choices=MODES, default=MODE_ANY)
+    max_missing = serializers.IntegerField(min_value=0, default=0)
+
+    def to_internal_value(self, data):
+        # ?ingredients=1,2&ingredients=3 -> [1, 2, 3]
+        if hasattr(data, "getlist"):
+            data = {
+                **data.dict(),
+                "ingredients": [
+                    value
+                    for item in data.getlist("ingredients")
+                    for value in item.split(",")
+                    if value
+                ],
+            }
+        return super().to_internal_value(data)
+
+
 class IngredientInRecipeReadSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source="ingredient.id")
     name = serializers.ReadOnlyField(source="ingredient.name")
@@ -126,15 +169,37 @@ class IngredientInRecipeReadSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class IngredientAmountListSerializer(serializers.ListSerializer):
+    """
+    Список {id, amount}: все id разрешаются в ингредиенты одним
+    запросом in_bulk(), отсутствующие перечисляются в одной ошибке.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredients = Ingredient.objects.in_bulk(
+            {item["id"] for item in items}
+        )
+        missing = sorted({item["id"] for item in items} - ingredients.keys())
+        if missing:
+            raise serializers.ValidationError(
+                "Ингредиенты не найдены: "
+                + ", ".join(str(pk) for pk in missing)
+            )
+        return [
+            {"ingredient": ingredients[item["id"]], "amount": item["amount"]}
+            for item in items
+        ]
+
+
 class IngredientInRecipeWriteSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(), source="ingredient"
-    )
+    id = serializers.IntegerField(min_value=1)
     amount = serializers.IntegerField(min_value=1)
 
     class Meta:
         model = IngredientInRecipe
         fields = ("id", "amount")
+        list_serializer_class = IngredientAmountListSerializer
 
 
 class RecipeListSerializer(serializers.ModelSerializer):
@@ -144,6 +209,7 @@ class RecipeListSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -155,12 +221,15 @@ class RecipeListSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
         read_only_fields = fields
 
     def get_is_favorited(self, recipe):
+        if hasattr(recipe, "is_favorited"):
+            return recipe.is_favorited
         user = self.context["request"].user
         return (
             user.is_authenticated
@@ -168,6 +237,8 @@ class RecipeListSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, recipe):
+        if hasattr(recipe, "is_in_shopping_cart"):
+            return recipe.is_in_shopping_cart
         user = self.context["request"].user
         return (
             user.is_authenticated
@@ -175,13 +246,27 @@ class RecipeListSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeCoverageSerializer(RecipeListSerializer):
+    """Рецепт с числом совпавших и недостающих ингредиентов."""
+
+    matched_ingredients = serializers.IntegerField(read_only=True)
+    missing_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + (
+            "matched_ingredients",
+            "missing_ingredients",
+        )
+        read_only_fields = fields
+
+
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            header, imgstr = data.split(";base64,", 1)
-            ext = header.split("/")[-1]
-            decoded = base64.b64decode(imgstr)
-            data = ContentFile(decoded, name=f"{uuid.uuid4()}.{ext}")
+            # Картинка уже проверена при приёме, повторно Pillow не нужен.
+            return serializers.FileField.to_internal_value(
+                self, ingest_base64_image(data, self.field_name)
+            )
         return super().to_internal_value(data)
 
 
@@ -209,6 +294,8 @@ class RecipeCreateWriteSerializer(serializers.ModelSerializer):
         return ingredients_list
 
     def _save_ingredients(self, recipe, ingredients_data):
+        if not ingredients_data:
+            return
         IngredientInRecipe.objects.bulk_create(
             IngredientInRecipe(
                 recipe=recipe,
@@ -217,23 +304,72 @@ class RecipeCreateWriteSerializer(serializers.ModelSerializer):
             )
             for item in ingredients_data
         )
+        INGREDIENT_RECIPES.change(
+            (item["ingredient"].id for item in ingredients_data), 1
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop("ingredients")
         recipe = super().create(validated_data)
         self._save_ingredients(recipe, ingredients_data)
+        schedule(recipe, "image")
         return recipe
 
+    def _update_ingredients(self, recipe, ingredients_data):
+        """
+        Сравнивает новый состав с сохранённым и пишет только разницу:
+        новые строки, изменённые количества и удалённые ингредиенты.
+        Итоги корзин сдвигаются на ту же разницу одним пересчётом.
+        """
+        existing = {
+            row.ingredient_id: row for row in recipe.ingredient_amounts.all()
+        }
+        amounts = {
+            item["ingredient"].id: item["amount"] for item in ingredients_data
+        }
+        removed = existing.keys() - amounts.keys()
+        added = [
+            item
+            for item in ingredients_data
+            if item["ingredient"].id not in existing
+        ]
+        changed = []
+        with batched():
+            for ingredient_id, amount in amounts.items():
+                row = existing.get(ingredient_id)
+                if row is None:
+                    CART_AMOUNTS.record(recipe.pk, ingredient_id, amount, 1)
+                elif row.amount != amount:
+                    CART_AMOUNTS.record(
+                        recipe.pk, ingredient_id, amount - row.amount, 0
+                    )
+                    row.amount = amount
+                    changed.append(row)
+            # bulk_create и bulk_update сигналов не посылают, поэтому их
+            # сдвиги записаны выше; удалённые строки учтут сигналы.
+            if removed:
+                recipe.ingredient_amounts.filter(
+                    ingredient_id__in=removed
+                ).delete()
+            self._save_ingredients(recipe, added)
+            IngredientInRecipe.objects.bulk_update(changed, ["amount"])
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = self.validate_ingredients(
             validated_data.pop("ingredients", None)
         )
-
+        if "image" in validated_data:
+            discard_image(instance.image.name, instance.image_variants)
+            instance.image_variants = {}
+            schedule(instance, "image")
         recipe = super().update(instance, validated_data)
-        recipe.ingredient_amounts.all().delete()
-
-        self._save_ingredients(recipe, ingredients_data)
+        self._update_ingredients(recipe, ingredients_data)
         return recipe
 
     def to_representation(self, instance):
-        return RecipeListSerializer(instance, context=self.context).data
+        recipe = Recipe.objects.for_listing(self.context["request"].user).get(
+            pk=instance.pk
+        )
+        return RecipeListSerializer(recipe, context=self.context).data
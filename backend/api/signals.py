@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+from recipes.signals import ingredients_changed
+from users.models import User
+
+from .cache import recipe_cache
+
+
+def invalidate_recipes(recipe_ids):
+    transaction.on_commit(lambda: recipe_cache.invalidate_recipes(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def recipe_ingredient_changed(instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(ingredients_changed)
+def ingredient_changed(**kwargs):
+    transaction.on_commit(recipe_cache.invalidate_all)
+
+
+@receiver(post_save, sender=User)
+def author_changed(instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    recipe_ids = list(instance.recipes.values_list("id", flat=True))
+    if recipe_ids:
+        invalidate_recipes(recipe_ids)
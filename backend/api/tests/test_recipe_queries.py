@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.benchmark import DatasetSize, seed_dataset, tiny_png
+from recipes.models import Ingredient, Recipe
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"])
+class RecipeQueryCountTest(TestCase):
+    """Число запросов списка и карточки рецепта не зависит от объёма."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            DatasetSize(users=5, recipes=40, ingredients=30)
+        )[0]
+
+    def setUp(self):
+        # Авторизованные запросы идут мимо кэша ответов.
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_list_does_not_depend_on_page_size(self):
+        expected = self.count_queries("/api/recipes/?limit=1")
+        for limit in (6, 40):
+            with self.subTest(limit=limit), self.assertNumQueries(expected):
+                response = self.client.get(f"/api/recipes/?limit={limit}")
+            self.assertEqual(len(response.data["results"]), limit)
+
+    def test_detail_does_not_depend_on_ingredient_count(self):
+        small, large = Recipe.objects.all()[:2]
+        small.ingredient_amounts.exclude(
+            pk=small.ingredient_amounts.first().pk
+        ).delete()
+        expected = self.count_queries(f"/api/recipes/{small.pk}/")
+        with self.assertNumQueries(expected):
+            self.client.get(f"/api/recipes/{large.pk}/")
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"], MEDIA_ROOT=tempfile.mkdtemp())
+class RecipeWriteQueryCountTest(TestCase):
+    """Создание и правка рецепта не делают запрос на каждый ингредиент."""
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = seed_dataset(
+            DatasetSize(users=2, recipes=4, ingredients=30)
+        )[0]
+        cls.ingredient_ids = list(
+            Ingredient.objects.values_list("id", flat=True)[:30]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def payload(self, ingredient_ids, amount=10):
+        return {
+            "ingredients": [
+                {"id": pk, "amount": amount} for pk in ingredient_ids
+            ],
+            "image": tiny_png(),
+            "name": "Рецепт",
+            "text": "Описание",
+            "cooking_time": 10,
+        }
+
+    def count_queries(self, method, path, data):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(path, data, format="json")
+        self.assertIn(response.status_code, (200, 201))
+        return len(context)
+
+    def test_create_does_not_depend_on_ingredient_count(self):
+        ids = self.ingredient_ids
+        expected = self.count_queries(
+            "post", "/api/recipes/", self.payload(ids[:5])
+        )
+        self.assertEqual(
+            self.count_queries(
+                "post", "/api/recipes/", self.payload(ids[:20])
+            ),
+            expected,
+        )
+
+    def update_queries(self, count):
+        """
+        Правка рецепта из count ингредиентов: половина удаляется,
+        половина меняет количество, столько же добавляется.
+        """
+        ids = self.ingredient_ids
+        path = f"/api/recipes/{self.recipe.pk}/"
+        self.client.patch(path, self.payload(ids[:count]), format="json")
+        start = count // 2
+        target = ids[start:][:count]
+        return self.count_queries("patch", path, self.payload(target, 20))
+
+    def test_update_does_not_depend_on_ingredient_count(self):
+        self.recipe = Recipe.objects.filter(author=self.user).first()
+        self.assertEqual(self.update_queries(20), self.update_queries(4))
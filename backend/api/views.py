@@ -1,9 +1,11 @@
-import datetime
-
-from django.db.models import F, Sum
-from django.http import FileResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import (
@@ -20,25 +22,47 @@ from rest_framework.permissions import (
 )
 from rest_framework.response import Response
 
+from recipes.catalog import (
+    catalog_etag,
+    catalog_last_modified,
+    get_catalog_version,
+    ingredient_index,
+)
+from recipes.counters import RECIPE_CART, RECIPE_FAVORITES, batched
+from recipes.coverage import recipe_ingredient_index
+from recipes.feed import subscribed_recipes, timeline, uses_timeline
 from recipes.models import (
+    MINIFIED_FIELDS,
     Favorite,
     Ingredient,
-    IngredientInRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingCartIngredient,
 )
 from users.models import Subscription, User
 
+from .cache import recipe_cache
+from .exports import IgnoreFormatNegotiation, get_exporter
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import LimitPagination
+from .images import discard_image
+from .metrics import CACHE_REQUESTS, observe_export
+from .pagination import (
+    KeysetPagination,
+    KeysetPaginationMixin,
+    LimitPagination,
+)
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
     AvatarSerializer,
+    IngredientCoverageQuerySerializer,
     IngredientSerializer,
+    RecipeCoverageSerializer,
     RecipeCreateWriteSerializer,
+    RecipeIdsSerializer,
     RecipeListSerializer,
     RecipeMinifiedSerializer,
     UserWithRecipesSerializer,
+    get_recipes_limit,
 )
 
 
@@ -48,11 +72,44 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
     pagination_class = None
+    authentication_classes = []
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name", "")
+        limit = request.query_params.get("limit")
+        limit = int(limit) if limit is not None and limit.isdigit() else None
+
+        version = get_catalog_version()
+        etag = catalog_etag(version, name, limit)
+        last_modified = catalog_last_modified(version)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        CACHE_REQUESTS.labels(
+            "ingredient_etag", "miss" if response is None else "hit"
+        ).inc()
+        if response is None:
+            index = ingredient_index.get()
+            if name or limit is not None:
+                response = Response(index.search(name, limit))
+            elif request.accepted_renderer.format == "json":
+                response = HttpResponse(
+                    index.payload, content_type="application/json"
+                )
+            else:
+                response = Response(index.items)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
 
 
 class UserViewSet(DjoserUserViewSet):
     queryset = User.objects.all()
 
+    def get_queryset(self):
+        return super().get_queryset().with_is_subscribed(self.request.user)
+
     @action(
         detail=False,
         methods=["get"],
@@ -83,7 +140,10 @@ class UserViewSet(DjoserUserViewSet):
                 else None
             )
             return Response({"avatar": avatar_url})
-        user.avatar.delete(save=True)
+        discard_image(user.avatar.name, user.avatar_variants)
+        user.avatar_variants = {}
+        user.avatar = None
+        user.save(update_fields=["avatar", "avatar_variants"])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -116,23 +176,47 @@ class UserViewSet(DjoserUserViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class SubscriptionListView(generics.ListAPIView):
+class SubscriptionListView(KeysetPaginationMixin, generics.ListAPIView):
+    keyset_fields = ("created_at", "id")
     serializer_class = UserWithRecipesSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = LimitPagination
 
     def get_queryset(self):
-        return User.objects.filter(
-            subscriptions_to_me__user=self.request.user
-        ).distinct()
+        return (
+            Subscription.objects.filter(user=self.request.user)
+            .select_related("author")
+            .order_by("author__username")
+        )
 
+    def list(self, request, *args, **kwargs):
+        subscriptions = self.paginate_queryset(self.get_queryset())
+        authors = {}
+        for subscription in subscriptions:
+            author = subscription.author
+            author.is_subscribed = True
+            author.latest_recipes = []
+            authors[author.id] = author
+        for recipe in Recipe.objects.latest_by_author(
+            authors, get_recipes_limit(request)
+        ):
+            authors[recipe.author_id].latest_recipes.append(recipe)
+        serializer = self.get_serializer(list(authors.values()), many=True)
+        return self.get_paginated_response(serializer.data)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(KeysetPaginationMixin, viewsets.ModelViewSet):
+    keyset_fields = ("created", "id")
     queryset = Recipe.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        if self.action in ["list", "retrieve"]:
+            return Recipe.objects.for_listing(self.request.user)
+        return super().get_queryset()
+
     def get_serializer_class(self):
         return (
             RecipeListSerializer
@@ -140,6 +224,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
             else RecipeCreateWriteSerializer
         )
 
+    def list(self, request, *args, **kwargs):
+        return recipe_cache.fetch(
+            request, lambda: super(RecipeViewSet, self).list(request)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return recipe_cache.fetch(
+            request,
+            lambda: super(RecipeViewSet, self).retrieve(request, **kwargs),
+            recipe_id=kwargs[self.lookup_field],
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -153,6 +249,86 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         return entry
 
+    @staticmethod
+    def _bulk_insert(model, user, recipe_ids):
+        """
+        Добавляет недостающие строки model и возвращает id рецептов, строки
+        которых вставил именно этот запрос. Вставка без ignore_conflicts:
+        если параллельный запрос успел добавить часть строк, конфликт
+        откатывает точку сохранения, и вставка повторяется без них.
+        """
+
+        def missing(pks):
+            existing = set(
+                model.objects.filter(user=user, recipe_id__in=pks).values_list(
+                    "recipe_id", flat=True
+                )
+            )
+            return [pk for pk in pks if pk not in existing]
+
+        added = missing(recipe_ids)
+        while True:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(
+                        model(user=user, recipe_id=pk) for pk in added
+                    )
+                return added
+            except IntegrityError:
+                retry = missing(added)
+                # Конфликт не из-за чужих строк — повтор не поможет.
+                if len(retry) == len(added):
+                    raise
+                added = retry
+
+    @staticmethod
+    def _bulk_toggle(request, model, counter):
+        """
+        Добавляет или удаляет рецепты из списка model одним запросом
+        и возвращает статус по каждому id.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data["ids"]))
+        user = request.user
+        found = set(
+            Recipe.objects.filter(id__in=ids).values_list("id", flat=True)
+        )
+        if request.method == "POST":
+            statuses = ("created", "exists")
+            with transaction.atomic():
+                changed = RecipeViewSet._bulk_insert(model, user, found)
+                counter.change(changed, 1)
+                if model is ShoppingCart:
+                    ShoppingCartIngredient.objects.apply_recipes(
+                        [user.id], changed
+                    )
+        else:
+            changed = list(
+                model.objects.filter(user=user, recipe_id__in=ids).values_list(
+                    "recipe_id", flat=True
+                )
+            )
+            statuses = ("deleted", "missing")
+            with transaction.atomic(), batched():
+                model.objects.filter(user=user, recipe_id__in=changed).delete()
+        changed = set(changed)
+        return Response(
+            {
+                "results": [
+                    {
+                        "id": pk,
+                        "status": (
+                            "not_found"
+                            if pk not in found
+                            else statuses[pk not in changed]
+                        ),
+                    }
+                    for pk in ids
+                ]
+            }
+        )
+
     @action(methods=["get"], detail=True, url_path="get-link")
     def get_link(self, request, pk=None):
         if not Recipe.objects.filter(pk=pk).exists():
@@ -173,57 +349,59 @@ class RecipeViewSet(viewsets.ModelViewSet):
         user = request.user
 
         if request.method == "POST":
-            self._toggle_entry(ShoppingCart, user, recipe)
+            with transaction.atomic():
+                self._toggle_entry(ShoppingCart, user, recipe)
             data = RecipeMinifiedSerializer(
                 recipe, context={"request": request}
             ).data
             return Response(data, status=status.HTTP_201_CREATED)
 
-        get_object_or_404(ShoppingCart, user=user, recipe=recipe).delete()
+        with transaction.atomic():
+            get_object_or_404(ShoppingCart, user=user, recipe=recipe).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        methods=["post", "delete"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path="shopping_cart/bulk",
+    )
+    def shopping_cart_bulk(self, request):
+        return self._bulk_toggle(request, ShoppingCart, RECIPE_CART)
+
     @action(
         methods=["get"],
         detail=False,
         permission_classes=[IsAuthenticated],
         url_path="download_shopping_cart",
+        content_negotiation_class=IgnoreFormatNegotiation,
     )
     def download_shopping_cart(self, request):
         user = request.user
-        recipe_ids = user.shopping_carts.values_list("recipe_id", flat=True)
         ingredients = (
-            IngredientInRecipe.objects.filter(recipe_id__in=recipe_ids)
+            user.cart_ingredients.filter(total__gt=0)
             .values(
+                "total",
                 name=F("ingredient__name"),
                 measurement_unit=F("ingredient__measurement_unit"),
             )
-            .annotate(total=Sum("amount"))
             .order_by("name")
         )
-
-        today = datetime.date.today().strftime("%d.%m.%Y")
-        lines = [
-            f"Список покупок — {today}",
-            "",
-            "Ингредиенты:",
-            *[
-                f"{idx}. {ing['name'].capitalize()} "
-                f"({ing['measurement_unit']}) — {ing['total']}"
-                for idx, ing in enumerate(ingredients, 1)
-            ],
-            "",
-            "Рецепты:",
-            *[
-                f"{idx}. {rec.name} — {rec.author}"
-                for idx, rec in enumerate(
-                    Recipe.objects.filter(id__in=recipe_ids), 1
-                )
-            ],
-        ]
-
-        return FileResponse(
-            "\n".join(lines), as_attachment=True, filename="shopping_cart.txt"
+        exporter = get_exporter(
+            request.query_params.get("format"),
+            ingredients,
+            Recipe.objects.filter(shopping_carts__user=user).values_list(
+                "name", "author__email"
+            ),
+        )
+        response = StreamingHttpResponse(
+            observe_export(exporter.stream(), exporter.extension),
+            content_type=exporter.content_type,
         )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{exporter.filename}"'
+        )
+        return response
 
     @action(
         methods=["post", "delete"],
@@ -244,3 +422,128 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         get_object_or_404(Favorite, user=user, recipe=recipe).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        methods=["post", "delete"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path="favorite/bulk",
+    )
+    def favorite_bulk(self, request):
+        return self._bulk_toggle(request, Favorite, RECIPE_FAVORITES)
+
+    @action(
+        methods=["get"],
+        detail=False,
+        permission_classes=[permissions.AllowAny],
+        url_path="by_ingredients",
+    )
+    def by_ingredients(self, request):
+        """
+        Рецепты по имеющимся ингредиентам: подбор по инвертированному
+        индексу в памяти, из базы читается только текущая страница.
+        """
+        query = IngredientCoverageQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        rows = recipe_ingredient_index.match(
+            query.validated_data["ingredients"],
+            query.validated_data["mode"],
+            query.validated_data["max_missing"],
+        )
+        paginator = LimitPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        recipes = Recipe.objects.for_listing(request.user).in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        results = []
+        for recipe_id, matched, total in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.matched_ingredients = matched
+            recipe.missing_ingredients = total - matched
+            results.append(recipe)
+        serializer = RecipeCoverageSerializer(
+            results, many=True, context={"request": request}
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @staticmethod
+    def _neighbors_limit(request):
+        limit = request.query_params.get("limit", "")
+        if limit.isdigit() and int(limit) > 0:
+            return min(int(limit), settings.RECIPE_NEIGHBORS_TOP_K)
+        return LimitPagination.page_size
+
+    @action(methods=["get"], detail=True, url_path="similar")
+    def similar(self, request, pk=None):
+        """Похожие рецепты из предрасчитанной таблицы соседей."""
+        recipe = self.get_object()
+        limit = self._neighbors_limit(request)
+        recipes = Recipe.objects.similar_to(recipe.pk)[:limit]
+        return Response(
+            RecipeMinifiedSerializer(
+                recipes, many=True, context={"request": request}
+            ).data
+        )
+
+    @action(
+        methods=["get"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path="recommended",
+    )
+    def recommended(self, request):
+        """
+        Соседи рецептов из избранного и корзины пользователя; без них —
+        самые популярные чужие рецепты.
+        """
+        limit = self._neighbors_limit(request)
+        recipes = list(Recipe.objects.recommended_for(request.user)[:limit])
+        if not recipes:
+            recipes = (
+                Recipe.objects.exclude(author=request.user)
+                .only(*MINIFIED_FIELDS)
+                .order_by("-favorites_count", "-created")[:limit]
+            )
+        return Response(
+            RecipeMinifiedSerializer(
+                recipes, many=True, context={"request": request}
+            ).data
+        )
+
+    @action(
+        methods=["get"],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path="feed",
+    )
+    def feed(self, request):
+        """
+        Рецепты авторов из подписок от новых к старым, всегда с
+        keyset-пагинацией (cursor). Пользователям с большим числом
+        подписок лента читается из FeedEntry.
+        """
+        user = request.user
+        paginator = KeysetPagination()
+        if uses_timeline(user):
+            self.keyset_fields = ("created", "recipe_id")
+            entries = paginator.paginate_queryset(
+                timeline(user), request, view=self
+            )
+            recipes = Recipe.objects.for_listing(user).in_bulk(
+                [entry.recipe_id for entry in entries]
+            )
+            page = [
+                recipes[entry.recipe_id]
+                for entry in entries
+                if entry.recipe_id in recipes
+            ]
+        else:
+            page = paginator.paginate_queryset(
+                subscribed_recipes(user).for_listing(user), request, view=self
+            )
+        serializer = RecipeListSerializer(
+            page, many=True, context={"request": request}
+        )
+        return paginator.get_paginated_response(serializer.data)
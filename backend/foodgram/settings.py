@@ -50,7 +50,64 @@ INSTALLED_APPS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Фоновая обработка загруженных картинок (api/images.py)
+IMAGE_PIPELINE_ENABLED = os.getenv("IMAGE_PIPELINE_ENABLED", "1") in {
+    "1",
+    "true",
+    "yes",
+    "y",
+}
+IMAGE_PIPELINE_SYNC = os.getenv("IMAGE_PIPELINE_SYNC", "0") in {
+    "1",
+    "true",
+    "yes",
+    "y",
+}
+IMAGE_PIPELINE_WORKERS = int(os.getenv("IMAGE_PIPELINE_WORKERS", "2"))
+IMAGE_PIPELINE_FORMAT = os.getenv("IMAGE_PIPELINE_FORMAT", "WEBP")
+IMAGE_PIPELINE_QUALITY = int(os.getenv("IMAGE_PIPELINE_QUALITY", "85"))
+IMAGE_PIPELINE_MAX_SIDE = int(os.getenv("IMAGE_PIPELINE_MAX_SIDE", "2048"))
+
+# Приём картинок в base64: лимиты проверяются до полного декодирования
+IMAGE_UPLOAD_MAX_BYTES = int(
+    os.getenv("IMAGE_UPLOAD_MAX_BYTES", str(5 * 1024 * 1024))
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(os.getenv("IMAGE_UPLOAD_MAX_PIXELS", "25000000"))
+IMAGE_UPLOAD_SPOOL_BYTES = int(
+    os.getenv("IMAGE_UPLOAD_SPOOL_BYTES", str(1024 * 1024))
+)
+
+# Профилирование запросов (api/profiling.py): Server-Timing и
+# выборочный структурированный лог
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") in {
+    "1",
+    "true",
+    "yes",
+    "y",
+}
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+PROFILING_SLOW_REQUEST_MS = float(
+    os.getenv("PROFILING_SLOW_REQUEST_MS", "500")
+)
+PROFILING_SLOW_QUERY_MS = float(os.getenv("PROFILING_SLOW_QUERY_MS", "100"))
+
+# Похожие рецепты: сколько соседей хранится для каждого рецепта
+# (compute_recipe_neighbors)
+RECIPE_NEIGHBORS_TOP_K = int(os.getenv("RECIPE_NEIGHBORS_TOP_K", "20"))
+
+# Лента подписок (recipes/feed.py): с этого числа подписок рецепты
+# раскладываются по лентам при публикации; 0 — всегда join с подписками
+FEED_TIMELINE_MIN_FOLLOWING = int(
+    os.getenv("FEED_TIMELINE_MIN_FOLLOWING", "200")
+)
+
+# Админка: больше этого числа строк changelist не считает точно
+# (recipes/paginators.py)
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv("ADMIN_EXACT_COUNT_LIMIT", "10000"))
+
 MIDDLEWARE = [
+    "api.profiling.ProfilingMiddleware",
+    "api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -102,6 +159,31 @@ else:
         }
     }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Индексы в памяти процесса перечитываются не реже, чем раз в этот срок,
+# даже если сигнал об изменении потерялся (recipes/catalog.py,
+# recipes/coverage.py)
+LOCAL_INDEX_TTL = int(os.getenv("LOCAL_INDEX_TTL", "600"))
+
+RECIPE_CACHE_ALIAS = os.getenv("RECIPE_CACHE_ALIAS", "default")
+RECIPE_CACHE_TIMEOUT = int(os.getenv("RECIPE_CACHE_TIMEOUT", "300"))
+
 AUTH_USER_MODEL = "users.User"
 
 # Password validation
@@ -150,6 +232,11 @@ DJOSER = {
     },
 }
 
+SHOPPING_CART_PDF_FONT = os.getenv(
+    "SHOPPING_CART_PDF_FONT",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -171,3 +258,18 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.profiling": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
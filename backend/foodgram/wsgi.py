@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
 
 application = get_wsgi_application()
+
+from recipes.catalog import ingredient_index  # noqa: E402
+from recipes.coverage import recipe_ingredient_index  # noqa: E402
+
+ingredient_index.warm_up()
+recipe_ingredient_index.warm_up()
@@ -0,0 +1,18 @@
+import os
+import shutil
+
+
+def on_starting(server):
+    """Очищает метрики Prometheus, оставшиеся от прошлого запуска."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Помечает воркер завершившимся для MultiProcessCollector."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.db.models import Count
+from django.db.models import Prefetch
 from django.utils.safestring import mark_safe
 
 from .models import (
@@ -8,7 +8,9 @@ from .models import (
     IngredientInRecipe,
     Recipe,
     ShoppingCart,
+    ShoppingCartIngredient,
 )
+from .paginators import PerformanceAdminMixin
 
 
 class InRecipesFilter(admin.SimpleListFilter):
@@ -21,30 +23,22 @@ class InRecipesFilter(admin.SimpleListFilter):
 
     def queryset(self, request, queryset):
         if self.value() == "yes":
-            return queryset.filter(recipe_count__gt=0)
+            return queryset.filter(recipes_count__gt=0)
         if self.value() == "no":
-            return queryset.filter(recipe_count=0)
+            return queryset.filter(recipes_count=0)
         return queryset
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     search_fields = ("name", "measurement_unit")
-    list_display = ("id", "name", "measurement_unit", "recipe_count")
-    readonly_fields = ("recipe_count",)
+    list_display = ("id", "name", "measurement_unit", "recipes_count")
+    readonly_fields = ("recipes_count",)
     list_filter = ("measurement_unit", InRecipesFilter)
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.annotate(recipe_count=Count("recipes"))
-
-    @admin.display(description="В рецептах", ordering="recipe_count")
-    def recipe_count(self, ingredient):
-        return ingredient.recipe_count
-
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     search_fields = [
         "name",
         "author__email",
@@ -61,15 +55,24 @@ class RecipeAdmin(admin.ModelAdmin):
         "ingredients_html",
         "image_tag",
     )
-    readonly_fields = ("image_tag",)
+    readonly_fields = ("image_tag", "favorites_count", "cart_count")
+    list_select_related = ("author",)
+    autocomplete_fields = ("author",)
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.annotate(fav_cnt=Count("favorites"))
-
-    @admin.display(description="В избранном", ordering="fav_cnt")
-    def favorites_count(self, recipe):
-        return recipe.fav_cnt
+        # Ингредиенты подгружаются одним запросом на видимую страницу.
+        return (
+            super()
+            .get_queryset(request)
+            .prefetch_related(
+                Prefetch(
+                    "ingredient_amounts",
+                    queryset=IngredientInRecipe.objects.select_related(
+                        "ingredient"
+                    ),
+                )
+            )
+        )
 
     @admin.display(description="Ингредиенты")
     @mark_safe
@@ -77,7 +80,7 @@ class RecipeAdmin(admin.ModelAdmin):
         items = [
             (f"{ia.ingredient.name} — {ia.amount}"
              f" {ia.ingredient.measurement_unit}")
-            for ia in recipe.ingredient_amounts.select_related("ingredient")
+            for ia in recipe.ingredient_amounts.all()
         ]
         return "<br>".join(items)
 
@@ -92,6 +95,22 @@ class RecipeAdmin(admin.ModelAdmin):
         return "—"
 
 
-admin.site.register(IngredientInRecipe)
-admin.site.register(ShoppingCart)
-admin.site.register(Favorite)
+@admin.register(IngredientInRecipe)
+class IngredientInRecipeAdmin(PerformanceAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "recipe", "ingredient", "amount")
+    list_select_related = ("recipe", "ingredient")
+    autocomplete_fields = ("recipe", "ingredient")
+
+
+@admin.register(ShoppingCart, Favorite)
+class UserRecipeAdmin(PerformanceAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "user", "recipe")
+    list_select_related = ("user", "recipe")
+    autocomplete_fields = ("user", "recipe")
+
+
+@admin.register(ShoppingCartIngredient)
+class ShoppingCartIngredientAdmin(PerformanceAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "user", "ingredient", "total", "recipe_count")
+    list_select_related = ("user", "ingredient")
+    autocomplete_fields = ("user", "ingredient")
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from .models import Ingredient
+
+# Версия в целых секундах; старое имя ключа хранило наносекунды.
+CATALOG_VERSION_KEY = "recipes:ingredient-catalog-seconds"
+
+
+def normalize_name(value):
+    """Ключ поиска: регистр не важен, «ё» и «е» не различаются."""
+    return unicodedata.normalize("NFC", value).casefold().replace("ё", "е")
+
+
+def get_catalog_version():
+    """
+    Текущая версия каталога ингредиентов. Хранится в общем кэше без срока,
+    чтобы все процессы видели одну версию, и меняется только при правке
+    ингредиентов. Заводится заново лишь после очистки кэша.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = int(time.time())
+        if not cache.add(CATALOG_VERSION_KEY, version, timeout=None):
+            version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Версия — время изменения каталога в целых секундах, с той же точностью,
+    что и Last-Modified. Если за секунду изменений несколько, версия
+    уходит на секунду вперёд, поэтому у каждого изменения она своя и
+    If-Modified-Since не даст 304 на изменение внутри той же секунды.
+    """
+    now = int(time.time())
+    try:
+        version = cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        version = now
+    if version <= now:
+        version = now
+        cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def catalog_last_modified(version):
+    return int(version)
+
+
+def catalog_etag(version, name="", limit=None):
+    """Сильный ETag ответа каталога для версии и параметров поиска."""
+    if not name and limit is None:
+        return f'"{version}"'
+    query = hashlib.md5(
+        f"{normalize_name(name)}:{limit}".encode(), usedforsecurity=False
+    ).hexdigest()[:16]
+    return f'"{version}-{query}"'
+
+
+class IngredientIndex:
+    """
+    Отсортированный по нормализованному названию массив ингредиентов.
+    Поиск по префиксу — два бинарных поиска вместо LIKE-сканирования.
+    """
+
+    def __init__(self, ingredients, version=None):
+        rows = sorted(
+            (
+                (normalize_name(item["name"]), item["measurement_unit"], item)
+                for item in ingredients
+            ),
+            key=lambda row: row[:2],
+        )
+        self.keys = [key for key, _, _ in rows]
+        self.items = [dict(item) for _, _, item in rows]
+        self.version = version
+        self.loaded = time.monotonic()
+
+    @classmethod
+    def from_db(cls, version=None):
+        return cls(
+            Ingredient.objects.values("id", "name", "measurement_unit"),
+            version=version,
+        )
+
+    @cached_property
+    def payload(self):
+        """Полный каталог в JSON, сериализуется один раз на версию."""
+        return json.dumps(
+            self.items, ensure_ascii=False, separators=(",", ":")
+        ).encode()
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, prefix="", limit=None):
+        key = normalize_name(prefix)
+        start = bisect_left(self.keys, key)
+        end = bisect_left(self.keys, key + "\U0010ffff", lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.items[start:end]
+
+
+class IngredientIndexHolder:
+    """
+    Ленивая загрузка индекса и его пересборка при смене версии, а также
+    раз в LOCAL_INDEX_TTL — на случай, если смена версии потерялась.
+    Версия при такой пересборке не меняется.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_fresh(index, version):
+        return (
+            index is not None
+            and index.version == version
+            and time.monotonic() - index.loaded <= settings.LOCAL_INDEX_TTL
+        )
+
+    def get(self):
+        version = get_catalog_version()
+        index = self._index
+        if self.is_fresh(index, version):
+            return index
+        with self._lock:
+            if not self.is_fresh(self._index, version):
+                self._index = IngredientIndex.from_db(version)
+            return self._index
+
+    def warm_up(self):
+        """Загружает индекс при старте процесса, если база уже готова."""
+        try:
+            self.get()
+        except DatabaseError:
+            pass
+
+    def invalidate(self):
+        bump_catalog_version()
+        self._index = None
+
+
+ingredient_index = IngredientIndexHolder()
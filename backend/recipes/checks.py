@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Кэши, которые каждый процесс держит у себя
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Версии индексов в памяти процесса (recipes/catalog.py,
+    recipes/coverage.py) и поколения кэша ответов (api/cache.py) хранятся
+    в кэше Django. С кэшем в памяти процесса другие воркеры gunicorn и
+    management-команды не видят их смены.
+    """
+    if settings.DEBUG:
+        return []
+    return [
+        Warning(
+            f"Cache '{alias}' is local to each process, so other workers "
+            "and management commands do not see cache invalidations.",
+            hint="Set REDIS_URL to use a shared cache.",
+            id="recipes.W001",
+        )
+        for alias in sorted({"default", settings.RECIPE_CACHE_ALIAS})
+        if settings.CACHES.get(alias, {}).get("BACKEND")
+        in PROCESS_LOCAL_CACHES
+    ]
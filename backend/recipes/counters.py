@@ -0,0 +1,276 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.db import models
+from django.db.models.functions import Coalesce
+
+from users.models import Subscription, User
+
+from .models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    ShoppingCartIngredient,
+    recipe_amounts,
+)
+
+_pending = threading.local()
+
+
+@contextmanager
+def batched():
+    """
+    Внутри блока сигналы не обновляют счётчики сразу, а копят сдвиги.
+    На выходе каждый счётчик обновляется через Counter.apply(), то есть
+    удаление N строк стоит одного UPDATE, а не N.
+    """
+    if getattr(_pending, "deltas", None) is not None:
+        yield
+        return
+    _pending.deltas = defaultdict(lambda: defaultdict(int))
+    try:
+        yield
+        deltas, _pending.deltas = _pending.deltas, None
+        for counter, counter_deltas in deltas.items():
+            counter.apply(counter_deltas)
+    finally:
+        _pending.deltas = None
+
+
+@dataclass(frozen=True)
+class Counter:
+    """
+    Колонка field модели model хранит число строк source, ссылающихся
+    на объект через внешний ключ foreign_key. Если задана колонка
+    version, она увеличивается при каждом сдвиге счётчика.
+    """
+
+    model: type
+    field: str
+    source: type
+    foreign_key: str
+    version: str = ""
+
+    @property
+    def label(self):
+        return f"{self.model._meta.label}.{self.field}"
+
+    def change(self, pks, delta):
+        """Атомарно сдвигает счётчик объектов pks (без повторов) на delta."""
+        pks = list(pks)
+        if not pks:
+            return
+        updates = {self.field: models.F(self.field) + delta}
+        if self.version:
+            updates[self.version] = models.F(self.version) + 1
+        self.model.objects.filter(pk__in=pks).update(**updates)
+
+    def apply(self, deltas):
+        """
+        Сдвигает счётчики по словарю {pk: delta}: один UPDATE на каждое
+        различное значение delta.
+        """
+        pks_by_delta = defaultdict(list)
+        for pk, delta in deltas.items():
+            if delta:
+                pks_by_delta[delta].append(pk)
+        for delta, pks in pks_by_delta.items():
+            self.change(pks, delta)
+
+    def record(self, instance, delta):
+        pk = getattr(instance, f"{self.foreign_key}_id")
+        deltas = getattr(_pending, "deltas", None)
+        if deltas is None:
+            self.change([pk], delta)
+        else:
+            deltas[self][pk] += delta
+
+    def source_saved(self, instance, created=False, raw=False, **kwargs):
+        if created and not raw:
+            self.record(instance, 1)
+
+    def source_deleted(self, instance, **kwargs):
+        self.record(instance, -1)
+
+    def actual(self):
+        """Выражение с числом строк source, посчитанным заново."""
+        return Coalesce(
+            models.Subquery(
+                self.source.objects.filter(
+                    **{self.foreign_key: models.OuterRef("pk")}
+                )
+                .order_by()
+                .values(self.foreign_key)
+                .annotate(count=models.Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+
+    def mismatched(self):
+        return (
+            self.model.objects.annotate(actual=self.actual())
+            .exclude(**{self.field: models.F("actual")})
+            .order_by("pk")
+        )
+
+    def reconcile(self):
+        """Исправляет расходящиеся значения, возвращает их число."""
+        return self.model.objects.filter(
+            pk__in=self.mismatched().values("pk")
+        ).update(**{self.field: self.actual()})
+
+
+def deleting_recipes():
+    """id рецептов, удаление которых идёт сейчас в этом потоке."""
+    if getattr(_pending, "deleting", None) is None:
+        _pending.deleting = set()
+    return _pending.deleting
+
+
+class CartTotals:
+    """
+    Итоги корзин ShoppingCartIngredient: вклад рецепта прибавляется, когда
+    он попадает в корзину, и вычитается, когда его оттуда убирают. Сдвиги
+    копятся в batched() так же, как у Counter.
+
+    При удалении самого рецепта вклад вычитается из всех корзин сразу в
+    pre_delete, пока его ингредиенты ещё не удалены каскадом; строки
+    корзин, удаляемые тем же каскадом, пропускаются.
+    """
+
+    def apply(self, deltas):
+        """
+        Сдвигает итоги по словарю {(user_id, recipe_id): delta}: один
+        пересчёт на пользователя и знак.
+        """
+        recipe_ids = defaultdict(list)
+        for (user_id, recipe_id), delta in deltas.items():
+            if delta:
+                recipe_ids[user_id, delta].append(recipe_id)
+        for (user_id, delta), ids in recipe_ids.items():
+            ShoppingCartIngredient.objects.apply_recipes(
+                [user_id], ids, sign=delta
+            )
+
+    def record(self, instance, delta):
+        if instance.recipe_id in deleting_recipes():
+            return
+        key = (instance.user_id, instance.recipe_id)
+        deltas = getattr(_pending, "deltas", None)
+        if deltas is None:
+            self.apply({key: delta})
+        else:
+            deltas[self][key] += delta
+
+    def source_saved(self, instance, created=False, raw=False, **kwargs):
+        if created and not raw:
+            self.record(instance, 1)
+
+    def source_deleted(self, instance, **kwargs):
+        self.record(instance, -1)
+
+    def recipe_deleting(self, instance, **kwargs):
+        deleting_recipes().add(instance.pk)
+        user_ids = list(instance.shopping_carts.values_list("user", flat=True))
+        if user_ids:
+            ShoppingCartIngredient.objects.apply(
+                user_ids, recipe_amounts(instance), sign=-1
+            )
+
+    def recipe_deleted(self, instance, **kwargs):
+        deleting_recipes().discard(instance.pk)
+
+
+class CartAmounts:
+    """
+    Итоги корзин при правке состава рецепта: новая или удалённая строка
+    IngredientInRecipe и смена её количества сдвигают итоги всех корзин,
+    где лежит рецепт. Сдвиги копятся в batched() так же, как у Counter;
+    строки рецепта, который удаляется целиком, учитывает CartTotals.
+    """
+
+    def apply(self, deltas):
+        """
+        Сдвигает итоги по словарю {(recipe_id, ingredient_id): (сдвиг
+        total, сдвиг recipe_count)}: один пересчёт на рецепт.
+        """
+        recipe_deltas = defaultdict(dict)
+        for (recipe_id, ingredient_id), delta in deltas.items():
+            if any(delta):
+                recipe_deltas[recipe_id][ingredient_id] = delta
+        for recipe_id, ingredient_deltas in recipe_deltas.items():
+            ShoppingCartIngredient.objects.shift(
+                ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+                    "user", flat=True
+                ),
+                ingredient_deltas,
+            )
+
+    def record(self, recipe_id, ingredient_id, total, count):
+        if recipe_id in deleting_recipes():
+            return
+        key = (recipe_id, ingredient_id)
+        deltas = getattr(_pending, "deltas", None)
+        if deltas is None:
+            self.apply({key: (total, count)})
+        else:
+            pending_total, pending_count = deltas[self].get(key, (0, 0))
+            deltas[self][key] = (pending_total + total, pending_count + count)
+
+    def source_saving(self, instance, raw=False, **kwargs):
+        # Прежние ингредиент и количество: в post_save их уже не прочитать.
+        instance._cart_previous = None
+        if instance.pk is not None and not raw:
+            instance._cart_previous = (
+                IngredientInRecipe.objects.filter(pk=instance.pk)
+                .values_list("ingredient_id", "amount")
+                .first()
+            )
+
+    def source_saved(self, instance, raw=False, **kwargs):
+        previous = getattr(instance, "_cart_previous", None)
+        if raw or previous == (instance.ingredient_id, instance.amount):
+            return
+        with batched():
+            if previous is not None:
+                self.record(instance.recipe_id, previous[0], -previous[1], -1)
+            self.record(
+                instance.recipe_id, instance.ingredient_id, instance.amount, 1
+            )
+
+    def source_deleted(self, instance, **kwargs):
+        self.record(
+            instance.recipe_id, instance.ingredient_id, -instance.amount, -1
+        )
+
+
+# interactions_version помечает рецепт для пересчёта похожих
+# (recipes/recommendations.py).
+RECIPE_FAVORITES = Counter(
+    Recipe, "favorites_count", Favorite, "recipe", "interactions_version"
+)
+RECIPE_CART = Counter(
+    Recipe, "cart_count", ShoppingCart, "recipe", "interactions_version"
+)
+INGREDIENT_RECIPES = Counter(
+    Ingredient, "recipes_count", IngredientInRecipe, "ingredient"
+)
+USER_RECIPES = Counter(User, "recipes_count", Recipe, "author")
+USER_FOLLOWERS = Counter(User, "followers_count", Subscription, "author")
+USER_FOLLOWING = Counter(User, "following_count", Subscription, "user")
+
+COUNTERS = (
+    RECIPE_FAVORITES,
+    RECIPE_CART,
+    INGREDIENT_RECIPES,
+    USER_RECIPES,
+    USER_FOLLOWERS,
+    USER_FOLLOWING,
+)
+CART_TOTALS = CartTotals()
+CART_AMOUNTS = CartAmounts()
@@ -0,0 +1,197 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from .models import IngredientInRecipe
+
+CHANGES_SEQ_KEY = "recipes:coverage-seq"
+CHANGE_TIMEOUT = 60 * 60
+# При большем отставании дешевле перечитать индекс целиком.
+MAX_PENDING_CHANGES = 500
+
+MODE_ALL = "all"
+MODE_ANY = "any"
+MODE_MISSING = "missing"
+MODES = (MODE_ALL, MODE_ANY, MODE_MISSING)
+
+
+def change_key(seq):
+    return f"recipes:coverage-change:{seq}"
+
+
+def get_changes_seq():
+    """
+    Номер последнего изменения рецептов в общем кэше. Начальное значение —
+    время в наносекундах, поэтому после очистки кэша номер «скачет» и
+    процессы перечитывают индекс целиком.
+    """
+    seq = cache.get(CHANGES_SEQ_KEY)
+    if seq is None:
+        cache.add(CHANGES_SEQ_KEY, time.time_ns(), timeout=None)
+        seq = cache.get(CHANGES_SEQ_KEY)
+    return seq
+
+
+def record_changes(recipe_ids):
+    """Записывает id изменённых рецептов в журнал для всех процессов."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    get_changes_seq()
+    try:
+        seq = cache.incr(CHANGES_SEQ_KEY)
+    except ValueError:
+        return
+    cache.set(change_key(seq), recipe_ids, timeout=CHANGE_TIMEOUT)
+
+
+class RecipeIngredientIndex:
+    """
+    Инвертированный индекс: ингредиент -> отсортированный array id
+    рецептов, и обратно рецепт -> array id его ингредиентов. Тип "Q"
+    (8 байт) вмещает любые значения BigAutoField.
+    """
+
+    def __init__(self, pairs, seq=None):
+        postings = defaultdict(list)
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in pairs:
+            postings[ingredient_id].append(recipe_id)
+            recipes[recipe_id].append(ingredient_id)
+        self.postings = {
+            ingredient_id: array("Q", sorted(recipe_ids))
+            for ingredient_id, recipe_ids in postings.items()
+        }
+        self.recipes = {
+            recipe_id: array("Q", ingredient_ids)
+            for recipe_id, ingredient_ids in recipes.items()
+        }
+        self.seq = seq
+        self.loaded = time.monotonic()
+
+    @classmethod
+    def from_db(cls, seq=None):
+        return cls(
+            IngredientInRecipe.objects.values_list(
+                "recipe_id", "ingredient_id"
+            ).iterator(chunk_size=10000),
+            seq=seq,
+        )
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def update(self, recipe_ids, pairs):
+        """Заменяет ингредиенты рецептов recipe_ids на пары из pairs."""
+        for recipe_id in recipe_ids:
+            for ingredient_id in self.recipes.pop(recipe_id, ()):
+                posting = self.postings[ingredient_id]
+                del posting[bisect_left(posting, recipe_id)]
+                if not posting:
+                    del self.postings[ingredient_id]
+        for recipe_id, ingredient_id in pairs:
+            self.recipes.setdefault(recipe_id, array("Q")).append(
+                ingredient_id
+            )
+            insort(
+                self.postings.setdefault(ingredient_id, array("Q")),
+                recipe_id,
+            )
+
+    def match(self, ingredient_ids, mode=MODE_ANY, max_missing=0):
+        """
+        Рецепты, покрытые ингредиентами ingredient_ids, как
+        [(recipe_id, совпало, всего ингредиентов)]: сначала с большей
+        долей совпавших, затем с меньшим числом недостающих и новые.
+
+        all — в рецепте есть все ingredient_ids; any — хотя бы один;
+        missing — рецепту не хватает не больше max_missing ингредиентов.
+        """
+        wanted = set(ingredient_ids)
+        postings = [self.postings.get(pk, ()) for pk in wanted]
+        if mode == MODE_ALL:
+            shortest = min(postings, key=len, default=())
+            matched = {
+                recipe_id: len(wanted)
+                for recipe_id in shortest
+                if wanted.issubset(self.recipes[recipe_id])
+            }
+        else:
+            matched = Counter()
+            for posting in postings:
+                matched.update(posting)
+        rows = [
+            (recipe_id, count, len(self.recipes[recipe_id]))
+            for recipe_id, count in matched.items()
+        ]
+        if mode == MODE_MISSING:
+            rows = [row for row in rows if row[2] - row[1] <= max_missing]
+        rows.sort(key=lambda row: (-row[1] / row[2], row[2] - row[1], -row[0]))
+        return rows
+
+
+class RecipeIngredientIndexHolder:
+    """
+    Индекс процесса, который догоняет журнал изменений из общего кэша:
+    меняются только рецепты из журнала, целиком индекс читается при
+    старте, при большом отставании и раз в LOCAL_INDEX_TTL — на случай,
+    если запись в журнал потерялась.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Актуальный индекс; вызывать под self._lock."""
+        seq = get_changes_seq()
+        index = self._index
+        if (
+            index is None
+            or time.monotonic() - index.loaded > settings.LOCAL_INDEX_TTL
+            or not self._catch_up(index, seq)
+        ):
+            self._index = RecipeIngredientIndex.from_db(seq)
+        return self._index
+
+    def match(self, ingredient_ids, mode=MODE_ANY, max_missing=0):
+        # Индекс меняется на месте, поэтому поиск тоже под блокировкой.
+        with self._lock:
+            return self.get().match(ingredient_ids, mode, max_missing)
+
+    @staticmethod
+    def _catch_up(index, seq):
+        if not 0 <= seq - index.seq <= MAX_PENDING_CHANGES:
+            return False
+        if seq == index.seq:
+            return True
+        keys = [change_key(number) for number in range(index.seq + 1, seq + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        recipe_ids = {pk for ids in changes.values() for pk in ids}
+        index.update(
+            recipe_ids,
+            IngredientInRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values_list("recipe_id", "ingredient_id"),
+        )
+        index.seq = seq
+        return True
+
+    def warm_up(self):
+        """Загружает индекс при старте процесса, если база уже готова."""
+        try:
+            with self._lock:
+                self.get()
+        except DatabaseError:
+            pass
+
+
+recipe_ingredient_index = RecipeIngredientIndexHolder()
@@ -0,0 +1,122 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from users.models import Subscription
+
+from .models import FeedEntry, Recipe
+
+FAN_OUT_BATCH_SIZE = 1000
+
+
+def uses_timeline(user):
+    """Лента user читается из FeedEntry, а не join с подписками."""
+    threshold = settings.FEED_TIMELINE_MIN_FOLLOWING
+    return bool(threshold) and user.following_count >= threshold
+
+
+def subscribed_recipes(user):
+    """Рецепты авторов из подписок user одним join с Subscription."""
+    return Recipe.objects.filter(author__subscriptions_to_me__user=user)
+
+
+def timeline(user):
+    return FeedEntry.objects.filter(user=user).only(
+        "id", "recipe_id", "created"
+    )
+
+
+def add_entries(user_ids, recipes):
+    """recipes — пары (id, created); уже записанные пропускаются."""
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id, created=created)
+            for user_id in user_ids
+            for recipe_id, created in recipes
+        ),
+        batch_size=FAN_OUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(recipe_id, author_id, created):
+    """Раскладывает новый рецепт по лентам подписчиков автора."""
+    fan_out_recipes([(recipe_id, author_id, created)])
+
+
+def fan_out_recipes(recipes):
+    """
+    Раскладывает рецепты (id, author_id, created) по лентам подписчиков
+    их авторов: один запрос подписчиков на всю пачку.
+    """
+    threshold = settings.FEED_TIMELINE_MIN_FOLLOWING
+    if not threshold or not recipes:
+        return
+    by_author = defaultdict(list)
+    for recipe_id, author_id, created in recipes:
+        by_author[author_id].append((recipe_id, created))
+    followers = defaultdict(list)
+    for author_id, user_id in Subscription.objects.filter(
+        author_id__in=by_author, user__following_count__gte=threshold
+    ).values_list("author_id", "user_id"):
+        followers[author_id].append(user_id)
+    if followers:
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=user_id, recipe_id=recipe_id, created=created
+                )
+                for author_id, user_ids in followers.items()
+                for user_id in user_ids
+                for recipe_id, created in by_author[author_id]
+            ),
+            batch_size=FAN_OUT_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def rebuild(user_ids):
+    """Пересобирает ленты пользователей целиком."""
+    FeedEntry.objects.filter(user_id__in=user_ids).delete()
+    for user_id in user_ids:
+        add_entries(
+            [user_id],
+            subscribed_recipes(user_id)
+            .values_list("id", "created")
+            .iterator(chunk_size=FAN_OUT_BATCH_SIZE),
+        )
+
+
+def sync_subscription(user_id, author_id, subscribed):
+    """
+    Обновляет ленту после подписки или отписки. Лента заводится, когда
+    число подписок доходит до порога, и удаляется, когда опускается ниже.
+    """
+    threshold = settings.FEED_TIMELINE_MIN_FOLLOWING
+    if not threshold:
+        return
+    following = (
+        get_user_model()
+        .objects.filter(pk=user_id)
+        .values_list("following_count", flat=True)
+        .first()
+    )
+    if following is None or following < threshold - 1:
+        return
+    if subscribed:
+        if following == threshold:
+            rebuild([user_id])
+        elif following > threshold:
+            add_entries(
+                [user_id],
+                Recipe.objects.filter(author_id=author_id).values_list(
+                    "id", "created"
+                ),
+            )
+    elif following == threshold - 1:
+        FeedEntry.objects.filter(user_id=user_id).delete()
+    else:
+        FeedEntry.objects.filter(
+            user_id=user_id, recipe__author_id=author_id
+        ).delete()
@@ -0,0 +1,112 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from recipes import feed
+
+
+class Command(BaseCommand):
+    help = "Compare feed strategies: join on subscriptions vs timeline table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=5,
+            help="How many users with the most subscriptions to measure",
+        )
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=5,
+            help="Pages walked with the keyset cursor per user",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=6,
+            help="Recipes per page",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="How many times to walk every feed",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Для самых подписанных пользователей строит ленты FeedEntry во
+        временной транзакции (изменения откатываются) и листает обе ленты
+        одинаковым keyset-курсором, печатая задержки страниц в мс.
+        """
+        users = list(
+            get_user_model()
+            .objects.filter(following_count__gt=0)
+            .order_by("-following_count")[: options["users"]]
+        )
+        if not users:
+            self.stderr.write(self.style.ERROR("No subscriptions found."))
+            return
+
+        with transaction.atomic():
+            started = time.perf_counter()
+            feed.rebuild([user.pk for user in users])
+            build_ms = (time.perf_counter() - started) * 1000
+            self.stdout.write(
+                f"Timeline build: {build_ms:.1f} ms for {len(users)} users "
+                f"(following up to {users[0].following_count} authors)"
+            )
+            strategies = (
+                ("join", feed.subscribed_recipes, ("created", "id")),
+                ("timeline", feed.timeline, ("created", "recipe_id")),
+            )
+            pages = {}
+            for title, queryset, fields in strategies:
+                timings = []
+                for _ in range(options["repeat"]):
+                    for user in users:
+                        pages[title, user.pk] = self.walk(
+                            queryset(user), fields, options, timings
+                        )
+                timings.sort()
+                self.stdout.write(
+                    f"{title:>8}: {len(timings)} pages, "
+                    f"mean {statistics.fmean(timings):.3f} ms, "
+                    f"p50 {timings[len(timings) // 2]:.3f} ms, "
+                    f"p95 {timings[int(len(timings) * 0.95)]:.3f} ms"
+                )
+            if any(
+                pages["join", user.pk] != pages["timeline", user.pk]
+                for user in users
+            ):
+                self.stderr.write(
+                    self.style.WARNING("Strategies returned different pages.")
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def walk(queryset, fields, options, timings):
+        """Листает ленту курсором (created, id) и возвращает id рецептов."""
+        created, pk = fields
+        queryset = queryset.order_by(f"-{created}", f"-{pk}")
+        position, seen = None, []
+        for _ in range(options["pages"]):
+            page = queryset
+            if position is not None:
+                page = page.filter(
+                    Q(**{f"{created}__lt": position[0]})
+                    | Q(**{created: position[0], f"{pk}__lt": position[1]})
+                )
+            started = time.perf_counter()
+            rows = list(page.values_list(created, pk)[: options["page_size"]])
+            timings.append((time.perf_counter() - started) * 1000)
+            if not rows:
+                break
+            seen.extend(row[1] for row in rows)
+            position = rows[-1]
+        return seen
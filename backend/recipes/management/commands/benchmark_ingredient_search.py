@@ -0,0 +1,76 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.catalog import IngredientIndex
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = "Compare ingredient prefix search: ORM istartswith vs index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefix-length",
+            type=int,
+            default=2,
+            help="Length of prefixes taken from ingredient names",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="How many times to run every prefix",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Прогоняет одинаковые префиксы через name__istartswith и через
+        IngredientIndex и печатает задержки в миллисекундах.
+        """
+        length = options["prefix_length"]
+        prefixes = (
+            sorted(
+                {
+                    name[:length]
+                    for name in Ingredient.objects.values_list(
+                        "name", flat=True
+                    )
+                }
+            )
+            * options["repeat"]
+        )
+        if not prefixes:
+            self.stderr.write(self.style.ERROR("No ingredients loaded."))
+            return
+
+        def orm_search(prefix):
+            return list(
+                Ingredient.objects.filter(name__istartswith=prefix).values(
+                    "id", "name", "measurement_unit"
+                )
+            )
+
+        started = time.perf_counter()
+        index = IngredientIndex.from_db()
+        build_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(
+            f"Index build: {build_ms:.1f} ms for {len(index)} ingredients"
+        )
+        for title, search in (
+            ("orm", orm_search),
+            ("index", index.search),
+        ):
+            timings = []
+            for prefix in prefixes:
+                started = time.perf_counter()
+                search(prefix)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{title:>5}: {len(timings)} searches, "
+                f"mean {statistics.fmean(timings):.3f} ms, "
+                f"p50 {timings[len(timings) // 2]:.3f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95)]:.3f} ms"
+            )
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.recommendations import recompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute similar recipe lists from favorites and shopping carts "
+        "(only recipes affected since the last run unless --full)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Recompute neighbors of every recipe",
+        )
+        parser.add_argument(
+            "--top-k",
+            type=int,
+            default=settings.RECIPE_NEIGHBORS_TOP_K,
+            help="Neighbors stored per recipe",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Recipes whose similarities are computed at once",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Строит матрицу взаимодействий пользователей с рецептами и
+        перезаписывает топ-K соседей в одной транзакции.
+        """
+        if options["top_k"] < 1 or options["batch_size"] < 1:
+            raise CommandError("Top-k and batch size must be positive.")
+        started = time.monotonic()
+        with transaction.atomic():
+            recipes, neighbors = recompute(
+                options["top_k"], options["full"], options["batch_size"]
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recomputed {recipes} recipes, {neighbors} neighbors "
+                f"in {time.monotonic() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+from users.models import Subscription
+
+
+class Command(BaseCommand):
+    help = "Check with EXPLAIN that hot API queries use their indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force-index",
+            action="store_true",
+            help="PostgreSQL: disable seq scans so small tables still "
+            "show whether an index is usable",
+        )
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Print full query plans",
+        )
+
+    @staticmethod
+    def unique_index(model, name):
+        """
+        Уникальное ограничение в SQLite создаётся внутри CREATE TABLE и в
+        плане видно как sqlite_autoindex_<таблица>_N.
+        """
+        if connection.vendor == "sqlite":
+            return f"sqlite_autoindex_{model._meta.db_table}"
+        return name
+
+    def hot_queries(self):
+        """Пары (ожидаемый индекс, запрос) для горячих путей API."""
+        user_id = author_id = 1
+        queries = [
+            (
+                "recipe_created_id_idx",
+                Recipe.objects.order_by("-created", "-id")[:6],
+            ),
+            (
+                "recipe_author_created_idx",
+                Recipe.objects.filter(author_id=author_id).order_by(
+                    "-created"
+                )[:6],
+            ),
+            (
+                self.unique_index(Favorite, "unique_favorite"),
+                Recipe.objects.filter(favorites__user_id=user_id),
+            ),
+            (
+                self.unique_index(ShoppingCart, "unique_shoppingcart"),
+                Recipe.objects.annotate(
+                    is_in_shopping_cart=Exists(
+                        ShoppingCart.objects.filter(
+                            user_id=user_id, recipe=OuterRef("pk")
+                        )
+                    )
+                ).order_by("-created", "-id")[:6],
+            ),
+            (
+                "subscription_user_created_idx",
+                Subscription.objects.filter(user_id=user_id).order_by(
+                    "-created_at", "-id"
+                )[:6],
+            ),
+            (
+                self.unique_index(Favorite, "unique_favorite"),
+                Favorite.objects.filter(user_id=user_id, recipe_id=1),
+            ),
+        ]
+        if connection.vendor == "postgresql":
+            queries.append(
+                (
+                    "ingredient_name_trgm_idx",
+                    Ingredient.objects.filter(name__istartswith="абр"),
+                )
+            )
+        return queries
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        """
+        Для каждого запроса проверяет, что в плане встречается ожидаемый
+        индекс. Имеет смысл на заполненной базе (например, после seed).
+        """
+        if options["force_index"] and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        failures = []
+        for index_name, queryset in self.hot_queries():
+            plan = queryset.explain()
+            used = index_name in plan
+            status = "ok" if used else "MISSING"
+            self.stdout.write(f"[{status}] {index_name}")
+            if options["verbose_plans"] or not used:
+                self.stdout.write(plan)
+            if not used:
+                failures.append(index_name)
+        if failures:
+            raise CommandError(
+                f"Indexes not used by the planner: {', '.join(failures)}"
+            )
+        self.stdout.write(self.style.SUCCESS("All hot queries use indexes."))
@@ -1,27 +1,96 @@
+import csv
 import json
+import re
+from collections import defaultdict
+from itertools import islice
 from pathlib import Path
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
+from recipes.catalog import ingredient_index
 from recipes.models import Ingredient
+from recipes.signals import ingredients_changed
+
+SEPARATORS = re.compile(r"[\s,]*")
+
+
+def read_json(stream, chunk_size=64 * 1024):
+    """
+    Читает JSON-массив объектов поэлементно: в памяти держится только
+    текущий кусок файла, а не весь документ.
+    """
+    decoder = json.JSONDecoder()
+    buffer = stream.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("JSON array expected")
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+
+
+def read_csv(stream):
+    """Строки «название,единица»; строка-заголовок пропускается."""
+    for row in csv.reader(stream):
+        if not row or row == ["name", "measurement_unit"]:
+            continue
+        name, measurement_unit = row
+        yield {"name": name, "measurement_unit": measurement_unit}
+
+
+READERS = {"json": read_json, "csv": read_csv}
 
 
 class Command(BaseCommand):
-    help = "Load ingredients from JSON file"
+    help = "Load ingredients from a JSON or CSV file"
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--file",
             type=str,
-            help="Path to ingredients.json "
+            help="Path to ingredients.json or ingredients.csv "
             "(by default ../data/ingredients.json)",
         )
+        parser.add_argument(
+            "--format",
+            choices=READERS,
+            help="File format (by default taken from the file extension)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Ingredients written per bulk query",
+        )
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help="Update the measurement unit of ingredients whose "
+            "name already exists with a different unit",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print what would be inserted and updated",
+        )
 
     def handle(self, *args, **options):
         """
-        Загружает ингредиенты из JSON одним bulk-запросом.
-        Создаются только отсутствующие записи.
+        Загружает ингредиенты потоком, пачками по batch_size.
+        Существующие записи сверяются со словарём, загруженным один раз,
+        поэтому счётчики добавленных, обновлённых и пропущенных точные.
         """
         file_path = Path()
         try:
@@ -31,20 +100,70 @@ class Command(BaseCommand):
                 / "data"
                 / "ingredients.json"
             ).resolve()
+            reader = READERS[
+                options["format"] or file_path.suffix.lstrip(".").lower()
+            ]
+            self.existing = defaultdict(dict)
+            for pk, name, unit in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            ).iterator():
+                self.existing[name][unit] = pk
+            self.counts = dict.fromkeys(("inserted", "updated", "skipped"), 0)
 
-            with file_path.open(encoding="utf-8") as fh:
-                created = Ingredient.objects.bulk_create(
-                    [Ingredient(**item) for item in json.load(fh)],
-                    ignore_conflicts=True,
-                )
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f"Added new ingredients: {len(created)}."
-                    )
+            with file_path.open(encoding="utf-8", newline="") as fh:
+                items = reader(fh)
+                with transaction.atomic():
+                    while batch := list(islice(items, options["batch_size"])):
+                        self.load_batch(
+                            batch, options["upsert"], options["dry_run"]
+                        )
+            if not options["dry_run"] and (
+                self.counts["inserted"] or self.counts["updated"]
+            ):
+                ingredient_index.invalidate()
+                if self.counts["updated"]:
+                    ingredients_changed.send(sender=Ingredient)
+            prefix = "Dry run: " if options["dry_run"] else ""
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{prefix}inserted {self.counts['inserted']}, "
+                    f"updated {self.counts['updated']}, "
+                    f"skipped {self.counts['skipped']}."
                 )
+            )
         except Exception as exc:
             self.stderr.write(
                 self.style.ERROR(
                     f"Unexpected error in file {file_path}: {exc}"
                 )
             )
+
+    def load_batch(self, batch, upsert, dry_run):
+        to_create, to_update = [], []
+        for item in batch:
+            name = item["name"].strip()
+            unit = item["measurement_unit"].strip()
+            units = self.existing[name]
+            if unit in units:
+                self.counts["skipped"] += 1
+                continue
+            if upsert and len(units) == 1 and None not in units.values():
+                [(old_unit, pk)] = units.items()
+                units.clear()
+                units[unit] = pk
+                to_update.append(
+                    Ingredient(pk=pk, name=name, measurement_unit=unit)
+                )
+                if dry_run:
+                    self.stdout.write(f"~ {name}: {old_unit} -> {unit}")
+                continue
+            units[unit] = None
+            to_create.append(Ingredient(name=name, measurement_unit=unit))
+            if dry_run:
+                self.stdout.write(f"+ {name} ({unit})")
+        self.counts["inserted"] += len(to_create)
+        self.counts["updated"] += len(to_update)
+        if dry_run:
+            return
+        Ingredient.objects.bulk_create(to_create, ignore_conflicts=True)
+        Ingredient.objects.bulk_update(to_update, ["measurement_unit"])
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify aggregated shopping cart ingredient totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare stored totals with recomputed ones",
+        )
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="users",
+            help="Limit to the given user id (can be repeated)",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Пересчитывает итоги корзин по ShoppingCart и IngredientInRecipe.
+        С --verify только сообщает о расхождениях.
+        """
+        user_ids = options["users"]
+        if not options["verify"]:
+            with transaction.atomic():
+                count = ShoppingCartIngredient.objects.rebuild(user_ids)
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt cart ingredient rows: {count}.")
+            )
+            return
+
+        expected = ShoppingCartIngredient.objects.compute(user_ids)
+        stored = ShoppingCartIngredient.objects.all()
+        if user_ids is not None:
+            stored = stored.filter(user_id__in=user_ids)
+        actual = {
+            (user_id, ingredient_id): (total, recipe_count)
+            for user_id, ingredient_id, total, recipe_count in (
+                stored.values_list(
+                    "user_id", "ingredient_id", "total", "recipe_count"
+                )
+            )
+        }
+        mismatches = [
+            key
+            for key in expected.keys() | actual.keys()
+            if expected.get(key) != actual.get(key)
+        ]
+        for user_id, ingredient_id in sorted(mismatches):
+            self.stderr.write(
+                f"user={user_id} ingredient={ingredient_id}: "
+                f"stored={actual.get((user_id, ingredient_id))} "
+                f"expected={expected.get((user_id, ingredient_id))}"
+            )
+        if mismatches:
+            raise CommandError(
+                f"Found {len(mismatches)} mismatched cart ingredient rows."
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Cart ingredient rows are consistent: {len(expected)}."
+            )
+        )
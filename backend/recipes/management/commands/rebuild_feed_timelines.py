@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import feed
+from recipes.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild fan-out feed timelines for users following at least "
+        "FEED_TIMELINE_MIN_FOLLOWING authors and drop the others"
+    )
+
+    def handle(self, *args, **options):
+        """
+        Нужна после смены порога FEED_TIMELINE_MIN_FOLLOWING или правок
+        подписок и рецептов в обход ORM.
+        """
+        threshold = settings.FEED_TIMELINE_MIN_FOLLOWING
+        with transaction.atomic():
+            if not threshold:
+                FeedEntry.objects.all().delete()
+                user_ids = []
+            else:
+                FeedEntry.objects.filter(
+                    user__following_count__lt=threshold
+                ).delete()
+                user_ids = list(
+                    get_user_model()
+                    .objects.filter(following_count__gte=threshold)
+                    .values_list("id", flat=True)
+                )
+                feed.rebuild(user_ids)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {len(user_ids)} timelines, "
+                f"{FeedEntry.objects.count()} entries."
+            )
+        )
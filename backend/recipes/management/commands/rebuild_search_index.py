@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.search import get_recipe_search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of recipes"
+
+    def handle(self, *args, **options):
+        """Пересобирает индекс поиска для всех рецептов одним проходом."""
+        with transaction.atomic():
+            get_recipe_search().index()
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt."))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import COUNTERS
+
+
+class Command(BaseCommand):
+    help = "Recount denormalized counter columns and fix drifted values"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report mismatched counters without fixing them",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Сравнивает каждый счётчик с числом связанных строк.
+        С --check только сообщает о расхождениях.
+        """
+        if options["check"]:
+            total = 0
+            for counter in COUNTERS:
+                for obj in counter.mismatched()[:20]:
+                    self.stderr.write(
+                        f"{counter.label} pk={obj.pk}: "
+                        f"stored={getattr(obj, counter.field)} "
+                        f"expected={obj.actual}"
+                    )
+                total += counter.mismatched().count()
+            if total:
+                raise CommandError(f"Found {total} mismatched counters.")
+            self.stdout.write(self.style.SUCCESS("Counters are consistent."))
+            return
+
+        with transaction.atomic():
+            fixed = {
+                counter.label: counter.reconcile() for counter in COUNTERS
+            }
+        for label, count in fixed.items():
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Fixed counters: {sum(fixed.values())}.")
+        )
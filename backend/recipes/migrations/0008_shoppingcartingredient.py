@@ -0,0 +1,81 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+
+
+def fill_cart_ingredients(apps, schema_editor):
+    IngredientInRecipe = apps.get_model("recipes", "IngredientInRecipe")
+    ShoppingCartIngredient = apps.get_model(
+        "recipes", "ShoppingCartIngredient"
+    )
+    rows = (
+        IngredientInRecipe.objects.filter(recipe__shopping_carts__isnull=False)
+        .values("ingredient_id", user_id=F("recipe__shopping_carts__user"))
+        .annotate(total=Sum("amount"), recipe_count=Count("recipe_id"))
+        .order_by()
+    )
+    ShoppingCartIngredient.objects.bulk_create(
+        ShoppingCartIngredient(**row) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_alter_favorite_options_alter_shoppingcart_options"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingCartIngredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total",
+                    models.IntegerField(default=0, verbose_name="Всего"),
+                ),
+                (
+                    "recipe_count",
+                    models.IntegerField(default=0, verbose_name="Рецептов"),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="recipes.ingredient",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ингредиент в корзине",
+                "verbose_name_plural": "Ингредиенты в корзине",
+                "default_related_name": "cart_ingredients",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "ingredient"),
+                        name="unique_cart_ingredient",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_cart_ingredients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_shoppingcartingredient"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["created", "id"], name="recipe_created_id_idx"
+            ),
+        ),
+    ]
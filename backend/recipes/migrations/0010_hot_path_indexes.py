@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+TRIGRAM_INDEX = "ingredient_name_trgm_idx"
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Поиск по названию ингредиента (istartswith/icontains) в PostgreSQL
+    строится как UPPER(name::text) LIKE ..., поэтому индекс — триграммный
+    по тому же выражению. На других СУБД ничего не делаем.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON recipes_ingredient "
+        "USING gin (UPPER(name::text) gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_recipe_created_id_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "-created"], name="recipe_author_created_idx"
+            ),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
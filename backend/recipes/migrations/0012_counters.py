@@ -0,0 +1,82 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:02
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ("recipes.Recipe", "favorites_count", "recipes.Favorite", "recipe"),
+    ("recipes.Recipe", "cart_count", "recipes.ShoppingCart", "recipe"),
+    (
+        "recipes.Ingredient",
+        "recipes_count",
+        "recipes.IngredientInRecipe",
+        "ingredient",
+    ),
+    (settings.AUTH_USER_MODEL, "recipes_count", "recipes.Recipe", "author"),
+    (
+        settings.AUTH_USER_MODEL,
+        "followers_count",
+        "users.Subscription",
+        "author",
+    ),
+    (
+        settings.AUTH_USER_MODEL,
+        "following_count",
+        "users.Subscription",
+        "user",
+    ),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for model_label, field, source_label, foreign_key in COUNTERS:
+        source = apps.get_model(source_label)
+        apps.get_model(model_label).objects.update(
+            **{
+                field: Coalesce(
+                    Subquery(
+                        source.objects.filter(**{foreign_key: OuterRef("pk")})
+                        .order_by()
+                        .values(foreign_key)
+                        .annotate(count=Count("pk"))
+                        .values("count")
+                    ),
+                    0,
+                )
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0011_image_variants"),
+        ("users", "0005_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingredient",
+            name="recipes_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="В рецептах"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="cart_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="В корзинах"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="В избранном"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
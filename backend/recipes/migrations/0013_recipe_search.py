@@ -0,0 +1,69 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:18
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INGREDIENT_NAMES = (
+    "COALESCE((SELECT {concat} FROM recipes_ingredientinrecipe AS ir "
+    "JOIN recipes_ingredient AS i ON i.id = ir.ingredient_id "
+    "WHERE ir.recipe_id = r.id), '')"
+)
+
+POSTGRES_FORWARD = (
+    "CREATE INDEX recipe_search_vector_idx ON recipes_recipe "
+    "USING gin (search_vector)",
+    "UPDATE recipes_recipe AS r SET search_vector = "
+    "setweight(to_tsvector('russian', r.name), 'A') || "
+    "setweight(to_tsvector('russian', "
+    + INGREDIENT_NAMES.format(concat="string_agg(i.name, ' ')")
+    + "), 'B') || setweight(to_tsvector('russian', r.text), 'C')",
+)
+POSTGRES_BACKWARD = ("DROP INDEX IF EXISTS recipe_search_vector_idx",)
+
+SQLITE_FORWARD = (
+    "CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5("
+    "name, ingredients, text, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO recipes_recipe_fts (rowid, name, ingredients, text) "
+    "SELECT r.id, r.name, "
+    + INGREDIENT_NAMES.format(concat="group_concat(i.name, ' ')")
+    + ", r.text FROM recipes_recipe AS r",
+)
+SQLITE_BACKWARD = ("DROP TABLE IF EXISTS recipes_recipe_fts",)
+
+STATEMENTS = {
+    "postgresql": (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    "sqlite": (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run_statements(schema_editor, direction):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    run_statements(schema_editor, 0)
+
+
+def drop_search_index(apps, schema_editor):
+    run_statements(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0012_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 06:52
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def fill_timelines(apps, schema_editor):
+    """
+    Заводит ленты пользователям, у которых уже не меньше
+    FEED_TIMELINE_MIN_FOLLOWING подписок: иначе до rebuild_feed_timelines
+    их лента была бы пустой.
+    """
+    threshold = settings.FEED_TIMELINE_MIN_FOLLOWING
+    if not threshold:
+        return
+    FeedEntry = apps.get_model("recipes", "FeedEntry")
+    Recipe = apps.get_model("recipes", "Recipe")
+    user_ids = (
+        apps.get_model(settings.AUTH_USER_MODEL)
+        .objects.filter(following_count__gte=threshold)
+        .values_list("id", flat=True)
+    )
+    for user_id in user_ids.iterator():
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=user_id, recipe_id=recipe_id, created=created
+                )
+                for recipe_id, created in Recipe.objects.filter(
+                    author__subscriptions_to_me__user_id=user_id
+                )
+                .values_list("id", "created")
+                .iterator(chunk_size=BATCH_SIZE)
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0015_feed_entries"),
+        ("users", "0005_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,39 @@
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import RowNumber
 
 
-class Ingredient(models.Model):
+class CounterFieldsMixin:
+    """
+    Колонки counter_fields сдвигаются атомарно через F()
+    (recipes/counters.py), поэтому полное сохранение их не пишет:
+    значение, прочитанное до запроса, затёрло бы параллельные сдвиги.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if kwargs.get("update_fields") is None and not self._state.adding:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Ingredient(CounterFieldsMixin, models.Model):
     name = models.CharField("Название", max_length=128)
     measurement_unit = models.CharField("Единица измерения", max_length=64)
+    recipes_count = models.IntegerField(
+        "В рецептах", default=0, editable=False
+    )
+
+    counter_fields = ("recipes_count",)
 
     class Meta:
         ordering = ("name",)
@@ -22,13 +50,103 @@ class Ingredient(models.Model):
         return f"{self.name} ({self.measurement_unit})"
 
 
-class Recipe(models.Model):
+MINIFIED_FIELDS = ("id", "name", "image", "image_variants", "cooking_time")
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_user_flags(self, user):
+        """Аннотирует is_favorited и is_in_shopping_cart для user."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(False),
+                is_in_shopping_cart=models.Value(False),
+            )
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef("pk")
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef("pk")
+                )
+            ),
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """
+        Последние рецепты каждого из авторов одним запросом: при заданном
+        limit каждому автору достаётся не больше limit рецептов.
+        """
+        recipes = self.filter(author_id__in=author_ids).only(
+            "author_id", *MINIFIED_FIELDS
+        )
+        if limit is None:
+            return recipes
+        return recipes.annotate(
+            row_number=models.Window(
+                RowNumber(), partition_by="author_id", order_by="-created"
+            )
+        ).filter(row_number__lte=limit)
+
+    def similar_to(self, recipe_id):
+        """Предрасчитанные похожие рецепты, от самых близких."""
+        return (
+            self.filter(neighbor_of__recipe_id=recipe_id)
+            .only(*MINIFIED_FIELDS)
+            .order_by("-neighbor_of__score", "-created")
+        )
+
+    def recommended_for(self, user):
+        """
+        Соседи рецептов из избранного и корзины user, которых там ещё
+        нет; сходства с несколькими рецептами пользователя складываются.
+        """
+        favorites = Favorite.objects.filter(user=user).values("recipe")
+        cart = ShoppingCart.objects.filter(user=user).values("recipe")
+        return (
+            self.filter(
+                models.Q(neighbor_of__recipe__in=favorites)
+                | models.Q(neighbor_of__recipe__in=cart)
+            )
+            .exclude(pk__in=favorites)
+            .exclude(pk__in=cart)
+            .only(*MINIFIED_FIELDS)
+            .annotate(score=models.Sum("neighbor_of__score"))
+            .order_by("-score", "-created")
+        )
+
+    def for_listing(self, user):
+        """
+        Выборка для чтения рецептов: флаги пользователя, авторы с
+        is_subscribed и ингредиенты подгружаются фиксированным числом
+        запросов независимо от размера страницы.
+        """
+        return self.with_user_flags(user).prefetch_related(
+            models.Prefetch(
+                "author",
+                queryset=get_user_model().objects.with_is_subscribed(user),
+            ),
+            models.Prefetch(
+                "ingredient_amounts",
+                queryset=IngredientInRecipe.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
     name = models.CharField("Название", max_length=256)
     image = models.ImageField("Изображение", upload_to="recipes/images/")
+    image_variants = models.JSONField(
+        "Уменьшенные копии", default=dict, blank=True, editable=False
+    )
     text = models.TextField("Описание")
     cooking_time = models.PositiveIntegerField(
         "Время приготовления", validators=[MinValueValidator(1)]
@@ -37,6 +155,27 @@ class Recipe(models.Model):
         Ingredient, through="IngredientInRecipe", verbose_name="Ингредиенты"
     )
     created = models.DateTimeField("Дата создания", auto_now_add=True)
+    favorites_count = models.IntegerField(
+        "В избранном", default=0, editable=False
+    )
+    cart_count = models.IntegerField("В корзинах", default=0, editable=False)
+    # Заполняется только на PostgreSQL (recipes/search.py).
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Растёт при каждом изменении избранного и корзин рецепта;
+    # neighbors_version — её значение на момент расчёта похожих рецептов.
+    interactions_version = models.PositiveIntegerField(
+        default=0, editable=False
+    )
+    neighbors_version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    counter_fields = (
+        "favorites_count",
+        "cart_count",
+        "interactions_version",
+        "neighbors_version",
+    )
 
     def __str__(self):
         return self.name
@@ -46,6 +185,15 @@ class Recipe(models.Model):
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         default_related_name = "recipes"
+        indexes = [
+            models.Index(
+                fields=("created", "id"), name="recipe_created_id_idx"
+            ),
+            models.Index(
+                fields=("author", "-created"),
+                name="recipe_author_created_idx",
+            ),
+        ]
 
 
 class IngredientInRecipe(models.Model):
@@ -100,3 +248,229 @@ class Favorite(UserRecipeBase):
         verbose_name = "Избранное"
         verbose_name_plural = "Избранные"
         default_related_name = "favorites"
+
+
+class RecipeNeighbor(models.Model):
+    """
+    Похожий рецепт из предрасчитанного топ-K по совместным избранному и
+    корзинам (recipes/recommendations.py).
+    """
+
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name="neighbors"
+    )
+    neighbor = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name="neighbor_of"
+    )
+    score = models.FloatField("Сходство")
+
+    def __str__(self):
+        return f"{self.recipe_id} → {self.neighbor_id}: {self.score:.3f}"
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("recipe", "neighbor"), name="unique_recipe_neighbor"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("recipe", "-score"), name="recipe_neighbor_score_idx"
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """
+    Рецепт в ленте подписчика, записанный при публикации (fan-out on
+    write). Ведётся только для пользователей с большим числом подписок
+    (recipes/feed.py).
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+    )
+    # Копия Recipe.created: лента сортируется без join с рецептами.
+    created = models.DateTimeField("Дата создания рецепта")
+
+    def __str__(self):
+        return f"{self.user_id} ← {self.recipe_id}"
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента подписок"
+        default_related_name = "feed_entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_feed_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "-created", "-recipe"),
+                name="feed_user_created_idx",
+            )
+        ]
+
+
+class ShoppingCartIngredientQuerySet(models.QuerySet):
+    def apply(self, user_ids, amounts, sign=1):
+        """
+        Прибавляет (sign=1) или вычитает (sign=-1) вклад одного рецепта
+        в итоги корзин пользователей user_ids.
+        amounts — словарь {ingredient_id: amount}.
+        """
+        self.shift(
+            user_ids,
+            {
+                ingredient_id: (sign * amount, sign)
+                for ingredient_id, amount in amounts.items()
+            },
+        )
+
+    def shift(self, user_ids, deltas):
+        """
+        Сдвигает итоги корзин user_ids одним UPDATE.
+        deltas — словарь {ingredient_id: (сдвиг total, сдвиг recipe_count)}.
+        """
+        user_ids = list(user_ids)
+        if not user_ids or not deltas:
+            return
+        if any(count > 0 for _, count in deltas.values()):
+            self.bulk_create(
+                (
+                    self.model(user_id=user_id, ingredient_id=ingredient_id)
+                    for user_id in user_ids
+                    for ingredient_id, (_, count) in deltas.items()
+                    if count > 0
+                ),
+                ignore_conflicts=True,
+            )
+
+        def by_ingredient(position):
+            return models.Case(
+                *(
+                    models.When(
+                        ingredient_id=ingredient_id,
+                        then=models.Value(delta[position]),
+                    )
+                    for ingredient_id, delta in deltas.items()
+                ),
+                output_field=models.IntegerField(),
+            )
+
+        rows = self.filter(user_id__in=user_ids, ingredient_id__in=deltas)
+        rows.update(
+            total=models.F("total") + by_ingredient(0),
+            recipe_count=models.F("recipe_count") + by_ingredient(1),
+        )
+        if any(count < 0 for _, count in deltas.values()):
+            rows.filter(recipe_count__lte=0).delete()
+
+    def apply_recipes(self, user_ids, recipe_ids, sign=1):
+        """Вклад сразу нескольких рецептов, посчитанный одним запросом."""
+        self.shift(
+            user_ids,
+            {
+                row["ingredient_id"]: (
+                    sign * row["total"],
+                    sign * row["recipe_count"],
+                )
+                for row in IngredientInRecipe.objects.filter(
+                    recipe_id__in=recipe_ids
+                )
+                .values("ingredient_id")
+                .annotate(
+                    total=models.Sum("amount"),
+                    recipe_count=models.Count("recipe_id"),
+                )
+                .order_by()
+            },
+        )
+
+    def compute(self, user_ids=None):
+        """Итоги корзин, посчитанные заново по ShoppingCart."""
+        amounts = IngredientInRecipe.objects.filter(
+            recipe__shopping_carts__isnull=False
+        )
+        if user_ids is not None:
+            amounts = amounts.filter(recipe__shopping_carts__user__in=user_ids)
+        return {
+            (row["user_id"], row["ingredient_id"]): (
+                row["total"],
+                row["recipe_count"],
+            )
+            for row in amounts.values(
+                "ingredient_id",
+                user_id=models.F("recipe__shopping_carts__user"),
+            )
+            .annotate(
+                total=models.Sum("amount"),
+                recipe_count=models.Count("recipe_id"),
+            )
+            .order_by()
+        }
+
+    def rebuild(self, user_ids=None):
+        rows = self.compute(user_ids)
+        stale = (
+            self.all()
+            if user_ids is None
+            else self.filter(user_id__in=user_ids)
+        )
+        stale.delete()
+        self.bulk_create(
+            self.model(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total=total,
+                recipe_count=recipe_count,
+            )
+            for (user_id, ingredient_id), (total, recipe_count) in rows.items()
+        )
+        return len(rows)
+
+
+def recipe_amounts(recipe):
+    return dict(recipe.ingredient_amounts.values_list("ingredient", "amount"))
+
+
+class ShoppingCartIngredient(models.Model):
+    """
+    Итог по ингредиенту в корзине пользователя. Поддерживается
+    инкрементально при изменении корзины и ингредиентов рецептов.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+    )
+    total = models.IntegerField("Всего", default=0)
+    recipe_count = models.IntegerField("Рецептов", default=0)
+
+    objects = ShoppingCartIngredientQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.user} – {self.ingredient}: {self.total}"
+
+    class Meta:
+        verbose_name = "Ингредиент в корзине"
+        verbose_name_plural = "Ингредиенты в корзине"
+        default_related_name = "cart_ingredients"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique_cart_ingredient",
+            )
+        ]
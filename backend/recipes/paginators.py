@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_rows(queryset):
+    """Оценка числа строк таблицы из статистики PostgreSQL или None."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # -1: таблица ещё ни разу не анализировалась.
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для changelist без точного COUNT(*) по большим таблицам.
+    Без фильтров на PostgreSQL число строк берётся из pg_class.reltuples;
+    иначе считается не больше ADMIN_EXACT_COUNT_LIMIT + 1 строк.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimated_rows(queryset)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[: limit + 1].count()
+
+
+class PerformanceAdminMixin:
+    """Оценочная пагинация и без повторного COUNT(*) по всей таблице."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
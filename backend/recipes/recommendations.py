@@ -0,0 +1,137 @@
+import numpy as np
+from django.db.models import F, Q
+from scipy import sparse
+
+from .models import Favorite, Recipe, RecipeNeighbor, ShoppingCart
+
+# Избранное говорит о вкусе сильнее, чем список покупок.
+INTERACTION_WEIGHTS = ((Favorite, 1.0), (ShoppingCart, 0.5))
+
+
+def interaction_matrix():
+    """
+    Разреженная матрица пользователи × рецепты с весами избранного и
+    корзины и отсортированный массив id рецептов её столбцов.
+    """
+    pairs, weights = [], []
+    for model, weight in INTERACTION_WEIGHTS:
+        rows = np.fromiter(
+            (
+                value
+                for pair in model.objects.values_list(
+                    "user_id", "recipe_id"
+                ).iterator(chunk_size=10000)
+                for value in pair
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        pairs.append(rows)
+        weights.append(np.full(len(rows), weight))
+    pairs = np.concatenate(pairs)
+    user_ids, users = np.unique(pairs[:, 0], return_inverse=True)
+    recipe_ids, recipes = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csc_matrix(
+        (np.concatenate(weights), (users, recipes)),
+        shape=(len(user_ids), len(recipe_ids)),
+    )
+    return matrix, recipe_ids
+
+
+def cosine_neighbors(matrix, columns, top_k):
+    """
+    Для столбцов columns — top_k ближайших рецептов по косинусу
+    совместных взаимодействий: C = Xᵀ·X, score = C_ij / √(C_ii·C_jj).
+    Возвращает (column, соседи, score) для каждого столбца.
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    cooccurrence = (matrix[:, columns].T @ matrix).tocsr()
+    for row, column in enumerate(columns):
+        start, end = cooccurrence.indptr[row], cooccurrence.indptr[row + 1]
+        neighbors = cooccurrence.indices[start:end]
+        scores = cooccurrence.data[start:end] / (
+            norms[column] * norms[neighbors]
+        )
+        keep = neighbors != column
+        neighbors, scores = neighbors[keep], scores[keep]
+        if len(scores) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+            neighbors, scores = neighbors[best], scores[best]
+        yield column, neighbors, scores
+
+
+def changed_recipe_versions():
+    """
+    Рецепты, чьё избранное или корзины менялись после прошлого расчёта:
+    {id: interactions_version}. Версии читаются до матрицы, поэтому
+    изменение, пришедшее во время расчёта, останется на следующий раз.
+    """
+    return dict(
+        Recipe.objects.exclude(
+            neighbors_version=F("interactions_version")
+        ).values_list("id", "interactions_version")
+    )
+
+
+def affected_columns(matrix, recipe_ids, changed):
+    """
+    Столбцы, чьи списки соседей могли измениться: сами изменённые
+    рецепты и всё, что встречается вместе с ними сейчас.
+    """
+    columns = np.flatnonzero(np.isin(recipe_ids, list(changed)))
+    if not len(columns):
+        return columns
+    partners = (matrix[:, columns].T @ matrix).tocsr().indices
+    return np.union1d(columns, partners)
+
+
+def recompute(top_k, full=False, batch_size=500):
+    """
+    Пересчитывает таблицу RecipeNeighbor: целиком при full, иначе только
+    для рецептов, затронутых изменениями. Возвращает число пересчитанных
+    рецептов и записанных соседей.
+    """
+    versions = changed_recipe_versions()
+    matrix, recipe_ids = interaction_matrix()
+    stale = RecipeNeighbor.objects.all()
+    if full:
+        columns = np.arange(len(recipe_ids))
+    else:
+        changed = set(versions)
+        columns = affected_columns(matrix, recipe_ids, changed)
+        # Старые списки удаляются и у рецептов, потерявших все
+        # взаимодействия, и у тех, где изменённые были соседями.
+        dirty = set(recipe_ids[columns].tolist())
+        dirty.update(
+            RecipeNeighbor.objects.filter(
+                Q(recipe_id__in=changed) | Q(neighbor_id__in=changed)
+            ).values_list("recipe_id", flat=True)
+        )
+        stale = stale.filter(recipe_id__in=dirty)
+        columns = np.flatnonzero(np.isin(recipe_ids, list(dirty)))
+    stale.delete()
+
+    written = 0
+    for start in range(0, len(columns), batch_size):
+        end = start + batch_size
+        rows = [
+            RecipeNeighbor(
+                recipe_id=int(recipe_ids[column]),
+                neighbor_id=int(recipe_ids[neighbor]),
+                score=float(score),
+            )
+            for column, neighbors, scores in cosine_neighbors(
+                matrix, columns[start:end], top_k
+            )
+            for neighbor, score in zip(neighbors, scores)
+        ]
+        RecipeNeighbor.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+    Recipe.objects.bulk_update(
+        (
+            Recipe(pk=pk, neighbors_version=version)
+            for pk, version in versions.items()
+        ),
+        ["neighbors_version"],
+        batch_size=1000,
+    )
+    return len(columns), written
@@ -0,0 +1,158 @@
+import re
+from itertools import islice
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = "russian"
+FTS_TABLE = "recipes_recipe_fts"
+INDEX_BATCH_SIZE = 500
+WORDS = re.compile(r"\w+")
+
+# Названия ингредиентов рецепта r одной строкой; {concat} — агрегат СУБД.
+INGREDIENT_NAMES = (
+    "COALESCE((SELECT {concat} FROM recipes_ingredientinrecipe AS ir "
+    "JOIN recipes_ingredient AS i ON i.id = ir.ingredient_id "
+    "WHERE ir.recipe_id = r.id), '')"
+)
+
+
+def chunked(ids, size=INDEX_BATCH_SIZE):
+    ids = iter(ids)
+    while chunk := list(islice(ids, size)):
+        yield chunk
+
+
+class RecipeSearch:
+    """
+    Полнотекстовый поиск по названию, ингредиентам и описанию рецепта.
+    Индекс обновляется сигналами (recipes/signals.py); массовые пути
+    (bulk_create, миграции) вызывают index() сами.
+    """
+
+    def index(self, recipe_ids=None):
+        """Переиндексирует рецепты recipe_ids (None — все)."""
+        with connection.cursor() as cursor:
+            if recipe_ids is None:
+                self.index_batch(cursor, None)
+                return
+            for batch in chunked(recipe_ids):
+                self.index_batch(cursor, batch)
+
+    def index_batch(self, cursor, recipe_ids):
+        raise NotImplementedError
+
+    def remove(self, recipe_ids):
+        """Убирает удалённые рецепты из индекса, если он отдельный."""
+
+    def search(self, recipes, value):
+        """Фильтрует recipes по value и сортирует по релевантности."""
+        raise NotImplementedError
+
+
+class PostgresRecipeSearch(RecipeSearch):
+    """Хранимый tsvector Recipe.search_vector с GIN-индексом."""
+
+    document = (
+        "setweight(to_tsvector('{config}', r.name), 'A') || "
+        "setweight(to_tsvector('{config}', {ingredients}), 'B') || "
+        "setweight(to_tsvector('{config}', r.text), 'C')"
+    ).format(
+        config=SEARCH_CONFIG,
+        ingredients=INGREDIENT_NAMES.format(concat="string_agg(i.name, ' ')"),
+    )
+
+    def index_batch(self, cursor, recipe_ids):
+        sql = f"UPDATE recipes_recipe AS r SET search_vector = {self.document}"
+        if recipe_ids is None:
+            cursor.execute(sql)
+        else:
+            cursor.execute(f"{sql} WHERE r.id = ANY(%s)", [recipe_ids])
+
+    def search(self, recipes, value):
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type="websearch"
+        )
+        return (
+            recipes.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F("search_vector"), query))
+            .order_by("-search_rank", "-created", "-id")
+        )
+
+
+class SqliteRecipeSearch(RecipeSearch):
+    """
+    Таблица FTS5 recipes_recipe_fts (rowid = id рецепта) для локальной
+    разработки: слова запроса ищутся по префиксу, порядок — bm25.
+    """
+
+    weights = "10.0, 4.0, 1.0"  # name, ingredients, text
+
+    def index_batch(self, cursor, recipe_ids):
+        if recipe_ids is None:
+            where, params = "", []
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        else:
+            placeholders = ", ".join(["%s"] * len(recipe_ids))
+            where, params = f" WHERE r.id IN ({placeholders})", recipe_ids
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+                params,
+            )
+        ingredients = INGREDIENT_NAMES.format(
+            concat="group_concat(i.name, ' ')"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) "
+            f"SELECT r.id, r.name, {ingredients}, r.text "
+            f"FROM recipes_recipe AS r{where}",
+            params,
+        )
+
+    def remove(self, recipe_ids):
+        with connection.cursor() as cursor:
+            for batch in chunked(recipe_ids):
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE rowid IN "
+                    f"({', '.join(['%s'] * len(batch))})",
+                    batch,
+                )
+
+    @staticmethod
+    def match_expression(value):
+        """Слова запроса в кавычках с префиксным поиском: "сыр"* "яйц"*."""
+        return " ".join(f'"{word}"*' for word in WORDS.findall(value))
+
+    def search(self, recipes, value):
+        match = self.match_expression(value)
+        if not match:
+            return recipes.none()
+        rank = RawSQL(
+            f"SELECT bm25({FTS_TABLE}, {self.weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s "
+            f"AND {FTS_TABLE}.rowid = recipes_recipe.id",
+            [match],
+            output_field=FloatField(),
+        )
+        matched = RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [match],
+        )
+        # bm25 тем меньше, чем релевантнее совпадение.
+        return (
+            recipes.filter(pk__in=matched)
+            .annotate(search_rank=rank)
+            .order_by("search_rank", "-created", "-id")
+        )
+
+
+SEARCH_BACKENDS = {
+    "postgresql": PostgresRecipeSearch(),
+    "sqlite": SqliteRecipeSearch(),
+}
+
+
+def get_recipe_search():
+    return SEARCH_BACKENDS[connection.vendor]
@@ -0,0 +1,119 @@
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+
+from users.models import Subscription
+
+from .catalog import ingredient_index
+from .counters import CART_AMOUNTS, CART_TOTALS, COUNTERS, deleting_recipes
+from .coverage import record_changes
+from .feed import fan_out, sync_subscription
+from .models import Ingredient, IngredientInRecipe, Recipe, ShoppingCart
+from .search import get_recipe_search
+
+# Отправляется после массового изменения ингредиентов (bulk_update),
+# которое не вызывает post_save.
+ingredients_changed = Signal()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    # После коммита: иначе другой процесс может перечитать каталог до
+    # коммита и закэшировать старые данные под новой версией.
+    transaction.on_commit(ingredient_index.invalidate)
+
+
+def reindex_on_commit(recipe_ids=None):
+    transaction.on_commit(lambda: get_recipe_search().index(recipe_ids))
+
+
+def record_changes_on_commit(recipe_ids):
+    transaction.on_commit(lambda: record_changes(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(instance, raw=False, **kwargs):
+    # После коммита: ингредиенты сохраняются уже после самого рецепта.
+    if not raw:
+        reindex_on_commit([instance.pk])
+        record_changes_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, raw=False, **kwargs):
+    if created and not raw:
+        recipe = (instance.pk, instance.author_id, instance.created)
+        transaction.on_commit(lambda: fan_out(*recipe))
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(instance, created, raw=False, **kwargs):
+    if created and not raw:
+        pair = (instance.user_id, instance.author_id)
+        transaction.on_commit(lambda: sync_subscription(*pair, True))
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(instance, **kwargs):
+    pair = (instance.user_id, instance.author_id)
+    transaction.on_commit(lambda: sync_subscription(*pair, False))
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(instance, **kwargs):
+    get_recipe_search().remove([instance.pk])
+    record_changes_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_ingredient_recipes(instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        reindex_on_commit(
+            list(instance.recipe_ingredients.values_list("recipe", flat=True))
+        )
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def reindex_ingredient_amount(instance, raw=False, **kwargs):
+    # Строки, удаляемые каскадом вместе с рецептом, убирает unindex_recipe;
+    # каскад от удаления ингредиента проходит здесь же.
+    if not raw and instance.recipe_id not in deleting_recipes():
+        reindex_on_commit([instance.recipe_id])
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def record_ingredient_amount(instance, raw=False, **kwargs):
+    # Удаление рецепта записывает в журнал unindex_recipe.
+    if not raw and instance.recipe_id not in deleting_recipes():
+        record_changes_on_commit([instance.recipe_id])
+
+
+@receiver(ingredients_changed)
+def reindex_all_recipes(**kwargs):
+    reindex_on_commit()
+
+
+# Счётчики обновляются поштучно; bulk_create и update() сигналов не
+# посылают, поэтому такие пути сдвигают счётчики сами (Counter.change).
+for counter in COUNTERS:
+    post_save.connect(counter.source_saved, sender=counter.source)
+    post_delete.connect(counter.source_deleted, sender=counter.source)
+
+# Итоги корзин: строки ShoppingCart поштучно, удаление рецепта — сразу
+# по всем корзинам (recipes.counters.CartTotals), правка состава рецепта —
+# по корзинам с этим рецептом (recipes.counters.CartAmounts).
+post_save.connect(CART_TOTALS.source_saved, sender=ShoppingCart)
+post_delete.connect(CART_TOTALS.source_deleted, sender=ShoppingCart)
+pre_delete.connect(CART_TOTALS.recipe_deleting, sender=Recipe)
+post_delete.connect(CART_TOTALS.recipe_deleted, sender=Recipe)
+pre_save.connect(CART_AMOUNTS.source_saving, sender=IngredientInRecipe)
+post_save.connect(CART_AMOUNTS.source_saved, sender=IngredientInRecipe)
+post_delete.connect(CART_AMOUNTS.source_deleted, sender=IngredientInRecipe)
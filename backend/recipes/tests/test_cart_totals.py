@@ -0,0 +1,52 @@
+from django.test import TestCase
+
+from api.benchmark import DatasetSize, seed_dataset
+from recipes.models import (
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCartIngredient,
+)
+
+
+class CartTotalsTest(TestCase):
+    """Итоги корзин следуют за правками состава рецептов через ORM."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(DatasetSize(users=5, recipes=20, ingredients=30))
+        cls.recipe = Recipe.objects.filter(shopping_carts__isnull=False)[0]
+        cls.free = Ingredient.objects.exclude(
+            recipe_ingredients__recipe=cls.recipe
+        )[:2]
+
+    def assertTotalsConsistent(self):
+        stored = {
+            (user_id, ingredient_id): (total, recipe_count)
+            for user_id, ingredient_id, total, recipe_count in (
+                ShoppingCartIngredient.objects.values_list(
+                    "user_id", "ingredient_id", "total", "recipe_count"
+                )
+            )
+        }
+        self.assertEqual(stored, ShoppingCartIngredient.objects.compute())
+
+    def test_row_changes(self):
+        row = IngredientInRecipe.objects.create(
+            recipe=self.recipe, ingredient=self.free[0], amount=7
+        )
+        self.assertTotalsConsistent()
+        row.amount = 30
+        row.save()
+        self.assertTotalsConsistent()
+        row.ingredient = self.free[1]
+        row.save()
+        self.assertTotalsConsistent()
+        row.delete()
+        self.assertTotalsConsistent()
+
+    def test_recipe_and_ingredient_delete(self):
+        self.recipe.ingredient_amounts.first().ingredient.delete()
+        self.assertTotalsConsistent()
+        self.recipe.delete()
+        self.assertTotalsConsistent()
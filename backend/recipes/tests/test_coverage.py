@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from api.benchmark import DatasetSize, seed_dataset
+from recipes.coverage import (
+    RecipeIngredientIndex,
+    RecipeIngredientIndexHolder,
+)
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+
+
+class RecipeIngredientIndexTest(TestCase):
+    """Индекс «ингредиент → рецепты» догоняет правки через ORM."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(DatasetSize(users=2, recipes=5, ingredients=10))
+        cls.recipe = Recipe.objects.first()
+        cls.saffron = Ingredient.objects.create(
+            name="шафран", measurement_unit="г"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.holder = RecipeIngredientIndexHolder()
+
+    def matched(self):
+        return [row[0] for row in self.holder.match([self.saffron.pk])]
+
+    def test_ingredient_amount_changes(self):
+        self.assertEqual(self.matched(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            row = IngredientInRecipe.objects.create(
+                recipe=self.recipe, ingredient=self.saffron, amount=1
+            )
+        self.assertEqual(self.matched(), [self.recipe.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            row.delete()
+        self.assertEqual(self.matched(), [])
+
+    def test_big_ids(self):
+        recipe_id = 2**40
+        index = RecipeIngredientIndex([(recipe_id, 1)])
+        index.update([recipe_id + 1], [(recipe_id + 1, 1)])
+        self.assertEqual(
+            [row[0] for row in index.match([1])], [recipe_id + 1, recipe_id]
+        )
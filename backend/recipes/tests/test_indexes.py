@@ -0,0 +1,20 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from api.benchmark import DatasetSize, seed_dataset
+
+
+class HotQueryIndexTest(TestCase):
+    """Горячие запросы API читают таблицы по индексам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(DatasetSize(users=5, recipes=40, ingredients=30))
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        # CommandError с перечнем индексов, если план обходит какой-то из них.
+        call_command("explain_hot_queries", "--force-index", stdout=out)
+        self.assertNotIn("MISSING", out.getvalue())
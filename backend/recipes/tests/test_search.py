@@ -0,0 +1,44 @@
+from django.test import TestCase
+
+from api.benchmark import DatasetSize, seed_dataset
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+from recipes.search import get_recipe_search
+
+
+class RecipeSearchIndexTest(TestCase):
+    """Поисковый индекс следует за правками состава рецептов через ORM."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(DatasetSize(users=2, recipes=5, ingredients=10))
+        get_recipe_search().index()
+        cls.recipe = Recipe.objects.first()
+        cls.saffron = Ingredient.objects.create(
+            name="шафран", measurement_unit="г"
+        )
+
+    def found(self):
+        return list(
+            get_recipe_search()
+            .search(Recipe.objects.all(), "шафран")
+            .values_list("id", flat=True)
+        )
+
+    def test_ingredient_amount_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            row = IngredientInRecipe.objects.create(
+                recipe=self.recipe, ingredient=self.saffron, amount=1
+            )
+        self.assertEqual(self.found(), [self.recipe.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            row.delete()
+        self.assertEqual(self.found(), [])
+
+    def test_ingredient_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientInRecipe.objects.create(
+                recipe=self.recipe, ingredient=self.saffron, amount=1
+            )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.saffron.delete()
+        self.assertEqual(self.found(), [])
@@ -1,8 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
-from django.db.models import Count
 from django.utils.safestring import mark_safe
 
+from recipes.paginators import PerformanceAdminMixin
+
 from .models import Subscription, User
 
 
@@ -25,32 +26,32 @@ class YesNoFilter(admin.SimpleListFilter):
 class HasRecipesFilter(YesNoFilter):
     title = "Есть рецепты"
     parameter_name = "has_recipes"
-    field_name = "recipe_count"
+    field_name = "recipes_count"
 
 
 class HasSubscriptionsFilter(YesNoFilter):
     title = "Есть подписки"
     parameter_name = "has_subs"
-    field_name = "subscription_count"
+    field_name = "following_count"
 
 
 class HasSubscribersFilter(YesNoFilter):
     title = "Есть подписчики"
     parameter_name = "has_followers"
-    field_name = "follower_count"
+    field_name = "followers_count"
 
 
 @admin.register(User)
-class UserAdmin(DjangoUserAdmin):
+class UserAdmin(PerformanceAdminMixin, DjangoUserAdmin):
     list_display = (
         "id",
         "username",
         "full_name",
         "email",
         "avatar_thumb",
-        "recipe_count",
-        "subscription_count",
-        "follower_count",
+        "recipes_count",
+        "following_count",
+        "followers_count",
         "is_staff",
     )
     list_display_links = ("username",)
@@ -66,41 +67,15 @@ class UserAdmin(DjangoUserAdmin):
 
     readonly_fields = (
         "avatar_thumb",
-        "recipe_count",
-        "subscription_count",
-        "follower_count",
+        "recipes_count",
+        "following_count",
+        "followers_count",
     )
 
-    def get_queryset(self, request):
-        qs = (
-            super()
-            .get_queryset(request)
-            .annotate(
-                recipe_count=Count("recipes", distinct=True),
-                subscription_count=Count(
-                    "subscriptions_from_me", distinct=True
-                ),
-                follower_count=Count("subscriptions_to_me", distinct=True),
-            )
-        )
-        return qs
-
     @admin.display(description="ФИО", ordering="first_name")
     def full_name(self, user):
         return f"{user.first_name} {user.last_name}".strip()
 
-    @admin.display(description="Рецептов", ordering="recipe_count")
-    def recipe_count(self, user):
-        return user.recipe_count
-
-    @admin.display(description="Подписок", ordering="subscription_count")
-    def subscription_count(self, user):
-        return user.subscription_count
-
-    @admin.display(description="Подписчиков", ordering="follower_count")
-    def follower_count(self, user):
-        return user.follower_count
-
     @admin.display(description="Аватар", boolean=False)
     @mark_safe
     def avatar_thumb(self, user):
@@ -115,7 +90,9 @@ class UserAdmin(DjangoUserAdmin):
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(PerformanceAdminMixin, admin.ModelAdmin):
     list_display = ("id", "user", "author", "created_at")
+    list_select_related = ("user", "author")
+    autocomplete_fields = ("user", "author")
     search_fields = ("user__username", "author__username")
     list_filter = ("created_at",)
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_alter_user_managers"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["user", "-created_at"],
+                name="subscription_user_created_idx",
+            ),
+        ),
+    ]
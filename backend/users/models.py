@@ -1,15 +1,36 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as DjangoUserManager
 from django.core.validators import RegexValidator
 from django.db import models
 
+from recipes.models import CounterFieldsMixin
+
 username_validator = RegexValidator(
     regex=r"^[\w.@+-]+\Z",
     message="Введите корректный никнейм: буквы, цифры, символы «@ . + - _»",
 )
 
 
-class User(AbstractUser):
+class UserQuerySet(models.QuerySet):
+    def with_is_subscribed(self, user):
+        """Аннотирует is_subscribed: подписан ли user на пользователя."""
+        if not user.is_authenticated:
+            return self.annotate(is_subscribed=models.Value(False))
+        return self.annotate(
+            is_subscribed=models.Exists(
+                Subscription.objects.filter(
+                    user=user, author=models.OuterRef("pk")
+                )
+            )
+        )
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
+class User(CounterFieldsMixin, AbstractUser):
     email = models.EmailField("Email", unique=True, max_length=254)
     username = models.CharField(
         "Никнейм",
@@ -23,6 +44,20 @@ class User(AbstractUser):
     avatar = models.ImageField(
         "Аватар", upload_to="users/", blank=True, null=True
     )
+    avatar_variants = models.JSONField(
+        "Уменьшенные копии аватара", default=dict, blank=True, editable=False
+    )
+    recipes_count = models.IntegerField("Рецептов", default=0, editable=False)
+    followers_count = models.IntegerField(
+        "Подписчиков", default=0, editable=False
+    )
+    following_count = models.IntegerField(
+        "Подписок", default=0, editable=False
+    )
+
+    objects = UserManager()
+
+    counter_fields = ("recipes_count", "followers_count", "following_count")
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name"]
@@ -55,6 +90,12 @@ class Subscription(models.Model):
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
         ordering = ("-created_at",)
+        indexes = [
+            models.Index(
+                fields=("user", "-created_at"),
+                name="subscription_user_created_idx",
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=("user", "author"),